@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+#Dimensions du cube : jour de publication, source, entreprise et ensembles de lieux / de contrats
+DIMENSIONS_CUBE = ['date_publication', 'origine', 'compagnie', 'id_lieux', 'id_contrats']
+
+
+# Fonction permettant d'attribuer à chaque offre l'identifiant de l'ensemble de ses valeurs
+def identifier_ensembles(longue, index_offres):
+    """
+    Deux offres ont le même identifiant si elles ont exactement les mêmes valeurs (ex: {douala, yaounde}).
+    Chaque valeur reçoit un poids aléatoire de 64 bits ; la somme des poids d'une offre identifie son
+    ensemble sans boucle Python (collision négligeable).
+
+    :param longue: Series catégorielle en forme longue, indexée par offre
+    :param index_offres: Index des offres
+    :return: (identifiants par offre, Series identifiant -> valeur en forme longue)
+    """
+    positions = index_offres.get_indexer(longue.index)
+    garder = positions >= 0
+    positions = positions[garder]
+    codes = longue.cat.codes.to_numpy()[garder]
+
+    poids = np.random.default_rng(0).integers(1, np.iinfo(np.uint64).max, size=len(longue.cat.categories),
+                                              dtype=np.uint64)
+    cles = np.zeros(len(index_offres), dtype=np.uint64)
+    np.add.at(cles, positions, poids[codes])
+    identifiants, _ = pd.factorize(cles)
+
+    # Une offre représentative par ensemble suffit pour retrouver ses valeurs
+    representants = pd.Series(np.arange(len(index_offres))).groupby(identifiants).first()
+    vers_identifiant = pd.Series(representants.index, index=representants.values)
+    retenues = np.isin(positions, representants.values)
+    groupes = pd.Series(longue.to_numpy()[garder][retenues],
+                        index=vers_identifiant.loc[positions[retenues]].to_numpy(), name=longue.name)
+    return identifiants.astype('int32'), groupes.astype('category')
+
+
+# Fonction permettant de construire le cube d'agrégats des offres
+def construire_cube(df_temporal, valeurs_multiples):
+    """
+    Agrège les offres par (jour, origine, compagnie, ensemble de lieux, ensemble de contrats).
+    Chaque offre n'est comptée que dans une cellule : les sommes de nb_offres sur n'importe quel
+    sous-ensemble de cellules restent des nombres d'offres exacts.
+    Ajoute aussi les colonnes id_lieux et id_contrats à df_temporal.
+
+    :param df_temporal: DataFrame préparé (voir prepare_temporal_dataframe)
+    :param valeurs_multiples: Colonnes lieu et type_contrat en forme longue
+    :return: dictionnaire {'cube', 'lieux', 'contrats'} ; lieux et contrats associent chaque
+             identifiant d'ensemble à ses valeurs
+    """
+    groupes = {}
+    for colonne, identifiant, cle in (('lieu', 'id_lieux', 'lieux'), ('type_contrat', 'id_contrats', 'contrats')):
+        longue = valeurs_multiples.get(colonne, pd.Series([], dtype='category', name=colonne))
+        df_temporal[identifiant], groupes[cle] = identifier_ensembles(longue, df_temporal.index)
+
+    colonnes = {
+        'date_publication': df_temporal['date_publication'].dt.normalize(),
+        'origine': df_temporal['origine'] if 'origine' in df_temporal.columns else 'inconnue',
+        'compagnie': df_temporal['compagnie'] if 'compagnie' in df_temporal.columns else np.nan,
+        'id_lieux': df_temporal['id_lieux'],
+        'id_contrats': df_temporal['id_contrats'],
+        'duree_validite_jours': df_temporal['duree_validite_jours'],
+    }
+    cube = pd.DataFrame(colonnes, index=df_temporal.index).groupby(
+        DIMENSIONS_CUBE, observed=True, dropna=False, sort=False
+    ).agg(
+        nb_offres=('id_lieux', 'size'),
+        somme_duree=('duree_validite_jours', 'sum'),
+        nb_duree=('duree_validite_jours', 'count'),
+    ).reset_index()
+
+    # Mêmes colonnes dérivées que df_temporal : les filtres de période s'appliquent aux deux
+    dates = cube['date_publication']
+    cube['annee_publication'] = dates.dt.year
+    cube['mois_publication'] = dates.dt.month
+    cube['jour_publication'] = dates.dt.day
+    cube['jour_semaine_publication'] = dates.dt.day_name()
+    cube['nom_mois'] = dates.dt.month_name()
+    cube['trimestre_publication'] = dates.dt.quarter
+    return {'cube': cube, 'lieux': groupes['lieux'], 'contrats': groupes['contrats']}
+
+
+# Fonction permettant de compter les offres par dimensions
+def sommer(cube, colonnes):
+    return cube.groupby(colonnes, observed=True)['nb_offres'].sum()
+
+
+# Fonction permettant d'obtenir les entreprises qui publient le plus
+def top_compagnies(cube, n=10):
+    return sommer(cube, 'compagnie').sort_values(ascending=False).head(n)
+
+
+# Fonction permettant de lister les valeurs (lieux ou contrats) présentes dans une partie du cube
+def valeurs_presentes(cube, groupes, identifiant):
+    return groupes[groupes.index.isin(cube[identifiant].unique())]
+
+
+# Fonction permettant de compter les mentions de chaque valeur (une offre à deux lieux compte pour les deux)
+def compter_valeurs(cube, groupes, identifiant):
+    offres_par_ensemble = sommer(cube, identifiant)
+    mentions = pd.Series(offres_par_ensemble.reindex(groupes.index).fillna(0).to_numpy(), index=groupes.to_numpy())
+    mentions = mentions.groupby(level=0, observed=True).sum().astype(int)
+    return mentions[mentions > 0].sort_values(ascending=False)
+
+
+# Fonction permettant de ne garder que les cellules dont l'ensemble contient une des valeurs choisies
+def filtrer_valeurs(table, groupes, identifiant, selection):
+    return table[table[identifiant].isin(groupes.index[groupes.isin(selection)])]
+
+
+# Fonction permettant de calculer la durée moyenne de validité à partir des sommes du cube
+def duree_moyenne(cube):
+    nb_duree = cube['nb_duree'].sum()
+    return cube['somme_duree'].sum() / nb_duree if nb_duree > 0 else np.nan
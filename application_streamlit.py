@@ -8,16 +8,31 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import warnings
-import ast
 import re
 import folium
+from folium.plugins import FastMarkerCluster
 from streamlit_folium import folium_static
+import pydeck as pdk
 import requests
 import io
 import os
 from urllib.parse import urlparse
+from stockage import lire_offres_parquet, origines_parquet, lire_offres_sqlite, origines_sqlite, lire_offres_csv, \
+    base_sqlite_disponible
+from normalisation import lire_jeu_normalise, eclater_valeurs
+from agregats import construire_cube, sommer, top_compagnies, valeurs_presentes, compter_valeurs, \
+    filtrer_valeurs, duree_moyenne
+from cache_calculs import CacheCalculs, empreinte_source
+from geocodage import IndexVilles, lire_referentiel, FICHIER_LIEUX_SUPPLEMENTAIRES
 warnings.filterwarnings('ignore')
 
+# Colonnes utilisées par le dashboard (la description, volumineuse, n'est pas chargée)
+COLONNES_DASHBOARD = ['lien', 'titre', 'compagnie', 'niveau_etude', 'experience', 'type_contrat',
+                      'lieu', 'date_publication', 'date_expiration', 'origine']
+
+# Budget mémoire (Mo) du cache des calculs du dashboard
+TAILLE_CACHE_MO = 512
+
 
 
 # Configuration de la page
@@ -35,43 +50,33 @@ st.markdown("---")
 # Fonction pour nettoyer les données avec plusieurs valeurs
 def nettoyer_valeurs_multiples(serie):
     """
-    Nettoie les colonnes qui peuvent contenir plusieurs valeurs séparées par des virgules
-    et retourne une liste de valeurs uniques
+    Passe une colonne pouvant contenir plusieurs valeurs ("a, b", "['a', 'b']" ou listes du jeu normalisé)
+    en forme longue : une ligne par (offre, valeur), valeurs en minuscules et en catégories.
+    L'index de la Series retournée est celui de l'offre, ce qui permet de filtrer avec isin.
     """
-    if serie.dtype == object:
-        # Essayer de convertir les chaînes qui ressemblent à des listes
-        def convertir_valeurs(x):
-            if pd.isna(x):
-                return []
-            if isinstance(x, str):
-                # Si c'est une chaîne qui ressemble à une liste
-                if x.startswith('[') and x.endswith(']'):
-                    try:
-                        return list(set(ast.literal_eval(x)))
-                    except:
-                        # Si l'évaluation échoue, traiter comme une chaîne normale
-                        pass
-                
-                # Séparer par des virgules et nettoyer
-                valeurs = [v.strip().lower() for v in x.split(',') if v.strip()]
-                return list(set(valeurs))
-            return []
-        
-        return serie.apply(convertir_valeurs)
-    return serie
+    valeurs_presentes = serie.dropna()
+    if len(valeurs_presentes) and isinstance(valeurs_presentes.iloc[0], (list, np.ndarray)):
+        # Valeurs déjà découpées (jeu normalisé)
+        longue = serie.explode().dropna().astype(str).str.strip().str.lower()
+        longue = longue[longue != '']
+        longue = longue[~pd.MultiIndex.from_arrays([longue.index, longue.values]).duplicated()]
+    else:
+        longue = eclater_valeurs(serie)
+        longue.index.name = None
+    return longue.astype('category').rename(serie.name)
 
-# Fonction pour préparer les données (version optimisée pour Streamlit)
-@st.cache_data
+# Fonction pour préparer les données (mise en cache par empreinte du jeu, voir CacheCalculs)
 def prepare_temporal_dataframe(df):
     """
     Prépare le DataFrame pour l'analyse temporelle des offres d'emploi
+    Retourne aussi les colonnes lieu et type_contrat en forme longue (voir nettoyer_valeurs_multiples)
+    et le cube d'agrégats qui alimente les graphiques (voir agregats.construire_cube)
     """
     df_temporal = df.copy()
     
-    # Nettoyer les colonnes avec des valeurs multiples
-    for col in ['lieu', 'type_contrat']:
-        if col in df_temporal.columns:
-            df_temporal[col] = nettoyer_valeurs_multiples(df_temporal[col])
+    # Un même lien récupéré lors de plusieurs crawls ne compte qu'une fois
+    if 'lien' in df_temporal.columns:
+        df_temporal = df_temporal.drop_duplicates(subset='lien', keep='last')
     
     # Convertir les colonnes de dates en datetime
     df_temporal['date_publication'] = pd.to_datetime(df_temporal['date_publication'], errors='coerce')
@@ -125,7 +130,16 @@ def prepare_temporal_dataframe(df):
     
     df_temporal['categorie_anciennete'] = df_temporal['jours_depuis_publication'].apply(categoriser_anciennete)
     
-    return df_temporal
+    # Éclater une seule fois les colonnes avec des valeurs multiples (forme longue, indexée par offre)
+    valeurs_multiples = {
+        col: nettoyer_valeurs_multiples(df_temporal[col])
+        for col in ['lieu', 'type_contrat'] if col in df_temporal.columns
+    }
+    
+    # Cube d'agrégats : les graphiques agrègent le cube au lieu de parcourir les offres
+    cube_offres = construire_cube(df_temporal, valeurs_multiples)
+    
+    return df_temporal, valeurs_multiples, cube_offres
 
 # Fonctions d'interprétation des graphiques
 def interpreter_evolution_mensuelle(df_mensuel):
@@ -313,51 +327,44 @@ def interpreter_comparaison_annees(df_annees, annees_comparaison):
     return interpretation
 
 ##############################################
+# Index des villes construit une seule fois à partir des fichiers locaux (partagé par les sessions)
+@st.cache_resource
+def obtenir_geocodeur():
+    return IndexVilles.depuis_fichiers()
+
 # Fonction pour le géocodage des villes
-@st.cache_data
 def geocode_ville(ville, pays="Cameroon"):
     """
-    Géocode une ville en utilisant Nominatim et retourne ses coordonnées
+    Géocode une ville hors ligne à partir du référentiel local et retourne ses coordonnées
+    Les noms approchants sont reconnus ("Yaoundé", "yaounde", "Dla"...) ; None si la ville est inconnue
+    pays : conservé pour compatibilité, le référentiel ne couvre que le Cameroun
     """
-    try:
-        geolocator = Nominatim(user_agent="mon_analyseur_emploi")
-        location = geolocator.geocode(f"{ville}, {pays}", timeout=10)
-        if location:
-            return [location.latitude, location.longitude]
-        return None
-    except Exception as e:
-        st.warning(f"Erreur de géocodage pour {ville}: {str(e)}")
-        return None
+    return obtenir_geocodeur().geocoder(ville)
 
 # Fonction pour préparer les données géographiques
-def prepare_geographic_dataframe(df_principal, df_villes_regions):
+def prepare_geographic_dataframe(df_principal, df_villes_regions, lieux=None):
     """
     Prépare les DataFrames pour l'analyse géographique des offres d'emploi
     Utilise un fichier villes-régions qui contient déjà le compte d'offres par ville
+    lieux : colonne lieu en forme longue (voir nettoyer_valeurs_multiples), éclatée depuis df_principal sinon
+    Calcul pur (aucun affichage, entrées non modifiées) : il est mis en cache par empreinte des deux fichiers
     """
-    st.info("Préparation des données géographiques...")
-    
-    # Copier les DataFrames pour ne pas modifier les originaux
-    df_geo_principal = df_principal.copy()
-    df_villes_regions_clean = df_villes_regions.copy()
-    
-    # Nettoyer et standardiser les noms de villes
-    def nettoyer_nom_ville(nom):
-        if pd.isna(nom):
-            return ['Non spécifié']
-        if isinstance(nom, (list, np.ndarray)):
-            # Si c'est une liste ou un array, retourner tous les éléments nettoyés
-            a = [str(item).title().strip() for item in nom if pd.notna(item) and str(item).strip() != '']
-            return a
-        # Si c'est une chaîne simple, la retourner dans une liste
-        b = str(nom).title().strip()
-        return b
+    # Seules les colonnes utiles sont gardées, les DataFrames d'origine ne sont ni copiés ni modifiés
+    colonnes_utiles = [col for col in ['lien', 'compagnie', 'date_publication'] if col in df_principal.columns]
+    df_geo_principal = df_principal[colonnes_utiles]
+    df_villes_regions_clean = df_villes_regions
+    
+    # Exploser les lieux (forme longue déjà calculée par l'étape temporelle)
+    if lieux is None:
+        lieux = nettoyer_valeurs_multiples(df_principal['lieu'])
 
-    # Appliquer le nettoyage et exploser les listes
-    df_geo_principal['lieu_clean'] = df_geo_principal['lieu']
-    df_geo_principal = df_geo_principal.explode('lieu_clean')
-    #df_villes_regions_clean['villes'] = df_villes_regions_clean['villes'].apply(nettoyer_nom_ville)
-    #df_villes_regions_clean['regions'] = df_villes_regions_clean['regions'].apply(nettoyer_nom_ville)
+    # Ramener chaque lieu à sa ville de référence (casse, accents, variantes, texte libre "Douala, Littoral")
+    # via l'index des villes : chaque lieu distinct n'est résolu qu'une fois
+    referentiel = pd.concat([df_villes_regions_clean, lire_referentiel((FICHIER_LIEUX_SUPPLEMENTAIRES,))],
+                            ignore_index=True)
+    lieux_resolus = IndexVilles(referentiel).resoudre_longue(lieux.astype(object))
+    lieux = lieux_resolus['ville'].fillna(lieux_resolus['lieu'])
+    df_geo_principal = df_geo_principal.join(lieux.rename('lieu_clean'))
     
     # Enrichissement du DataFrame principal avec les régions
     df_geo_enrichi = df_geo_principal.merge(
@@ -379,6 +386,16 @@ def prepare_geographic_dataframe(df_principal, df_villes_regions):
         'regions': 'region', 
         'count': 'nb_offres'
     }, inplace=True)
+
+    # Coordonnées manquantes complétées par le géocodage hors ligne, en un seul passage
+    if 'latitude' not in df_par_ville.columns or 'longitude' not in df_par_ville.columns \
+            or df_par_ville[['latitude', 'longitude']].isna().any().any():
+        coordonnees = obtenir_geocodeur().resoudre_lot(df_par_ville['ville'])
+        for colonne in ['latitude', 'longitude']:
+            if colonne in df_par_ville.columns:
+                df_par_ville[colonne] = df_par_ville[colonne].fillna(coordonnees[colonne])
+            else:
+                df_par_ville[colonne] = coordonnees[colonne]
     
     # Ajouter des informations complémentaires à partir du DataFrame principal
     if 'compagnie' in df_geo_enrichi.columns:
@@ -510,9 +527,42 @@ def prepare_geographic_dataframe(df_principal, df_villes_regions):
         'df_par_ville': df_par_ville,
         'df_par_region': df_par_region,
         'df_geo_temporel': df_geo_temporel,
+        'carte': preparer_couche_carte(df_par_ville),
         'insights': insights
     }
 
+# Couleurs des catégories d'activité (quartiles du nombre d'offres calculés sur df_par_ville)
+COULEURS_ACTIVITE = {
+    'Très actif (>Q75)': [215, 48, 39],
+    'Actif (Q50-Q75)': [252, 141, 89],
+    'Modéré (Q25-Q50)': [254, 224, 139],
+    'Peu actif (<Q25)': [26, 152, 80],
+}
+
+# Fonction pour préparer la couche de points de la carte
+def preparer_couche_carte(df_par_ville):
+    """
+    Prépare une fois pour toutes (elle est gardée avec les données géographiques) la table en colonnes
+    des villes géocodées : couleur selon la catégorie d'activité, taille proportionnelle à la racine
+    du nombre d'offres. La carte n'a plus qu'à la transmettre telle quelle au navigateur.
+    """
+    couche = df_par_ville.loc[
+        df_par_ville['latitude'].notna() & df_par_ville['longitude'].notna(),
+        ['ville', 'region', 'nb_offres', 'categorie_activite', 'latitude', 'longitude']
+    ].reset_index(drop=True)
+    couche['nb_offres'] = couche['nb_offres'].fillna(0).astype(int)
+    couche['region'] = couche['region'].fillna('Région inconnue').astype(str)
+
+    couleurs = couche['categorie_activite'].map(COULEURS_ACTIVITE)
+    couche['couleur'] = couleurs.map(lambda couleur: couleur if isinstance(couleur, list) else [128, 128, 128])
+    couche['couleur_hex'] = couche['couleur'].map(lambda couleur: '#%02x%02x%02x' % tuple(couleur))
+
+    maximum = couche['nb_offres'].max() if len(couche) > 0 else 0
+    part = np.sqrt(couche['nb_offres'] / maximum) if maximum > 0 else 0
+    couche['rayon_m'] = 2000 + 25000 * part
+    couche['rayon_px'] = 4 + 16 * part
+    return couche
+
 # Fonction pour afficher l'analyse géographique dans Streamlit
 def afficher_analyse_geographique(df_geo_data):
     """
@@ -621,67 +671,61 @@ def afficher_analyse_geographique(df_geo_data):
     
     with tab4:
         st.subheader("🧭 Carte Interactive des Offres d'Emploi")
-        villes_et_regions = pd.read_csv("df_ville_region_count.csv")
-       
-        # Créer la carte avec folium
-        if 'latitude' in villes_et_regions.columns:
-            # Calculer le centre de la carte (moyenne des coordonnées)
-            center_lat = villes_et_regions['latitude'].mean()
-            center_lon = villes_et_regions['longitude'].mean()
-            
-            # Créer la carte
-            m = folium.Map(location=[center_lat, center_lon], 
-                         zoom_start=6,
-                         tiles='CartoDB positron')
-            
-            # Ajouter une légende
-            legend_html = '''
-                <div style="position: fixed; bottom: 50px; left: 50px; z-index: 1000; background-color: white;
-                            padding: 10px; border-radius: 5px; box-shadow: 0 0 15px rgba(0,0,0,0.2);">
-                <h4>Nombre d'offres</h4>
-                <i class="fa fa-circle" style="color: red"></i> > 100<br>
-                <i class="fa fa-circle" style="color: orange"></i> 50-100<br>
-                <i class="fa fa-circle" style="color: yellow"></i> 20-50<br>
-                <i class="fa fa-circle" style="color: green"></i> < 20
-                </div>
-            '''
-            m.get_root().html.add_child(folium.Element(legend_html))
-            
-            # Ajouter les marqueurs pour chaque ville
-            for idx, row in villes_et_regions.iterrows():
-                if pd.notna(row['latitude']) and pd.notna(row['longitude']):
-                    # Déterminer la couleur en fonction du nombre d'offres
-                    if row['count'] > 5000:
-                        color = 'red'
-                    elif row['count'] > 1900:
-                        color = 'orange'
-                    elif row['count'] > 1800:
-                        color = 'yellow'
-                    else:
-                        color = 'green'
-                    
-                    # Créer le popup avec les informations
-                    popup_html = f"""
-                    <div style="width: 200px;">
-                        <h4>{row['villes']}</h4>
-                        <b>Région:</b> {row['regions']}<br>
-                        <b>Nombre d'offres:</b> {row['count']}<br>
-                    </div>
-                    """
-                    
-                    # Ajouter le marqueur
-                    folium.CircleMarker(
-                        location=[row['latitude'], row['longitude']],
-                        radius=min(10, max(8, row['count']/10)),  # Taille proportionnelle au nombre d'offres
-                        popup=folium.Popup(popup_html, max_width=300),
-                        color=color,
-                        fill=True,
-                        fill_color=color
-                    ).add_to(m)
-            
-            # Afficher la carte
+        couche = df_geo_data['carte']
+
+        if len(couche) > 0:
+            mode_carte = st.radio(
+                "Mode d'affichage",
+                ["⚡ WebGL (rapide)", "🗺️ Folium (marqueurs groupés)"],
+                horizontal=True,
+                help="Le mode WebGL dessine tous les points dans le navigateur et reste fluide avec des milliers de villes"
+            )
+
+            # Légende liée aux quartiles du nombre d'offres
+            legende = couche.groupby('categorie_activite')['nb_offres'].agg(['min', 'max'])
+            st.markdown(" ".join(
+                f"<span style='color:#%02x%02x%02x'>●</span> {categorie} ({legende.loc[categorie, 'min']}-{legende.loc[categorie, 'max']})"
+                % tuple(couleur)
+                for categorie, couleur in COULEURS_ACTIVITE.items() if categorie in legende.index
+            ), unsafe_allow_html=True)
+
             st.write("📍 Carte interactive des offres d'emploi au Cameroun")
-            folium_static(m)
+            if mode_carte == "⚡ WebGL (rapide)":
+                couche_points = pdk.Layer(
+                    'ScatterplotLayer',
+                    data=couche[['ville', 'region', 'nb_offres', 'latitude', 'longitude', 'couleur', 'rayon_m']],
+                    get_position='[longitude, latitude]',
+                    get_fill_color='couleur',
+                    get_radius='rayon_m',
+                    opacity=0.7,
+                    pickable=True,
+                )
+                vue_initiale = pdk.ViewState(latitude=couche['latitude'].mean(),
+                                             longitude=couche['longitude'].mean(), zoom=5.5)
+                st.pydeck_chart(pdk.Deck(
+                    layers=[couche_points],
+                    initial_view_state=vue_initiale,
+                    map_style=None,
+                    tooltip={'html': "<b>{ville}</b><br/>Région : {region}<br/>Offres : {nb_offres}"}
+                ))
+            else:
+                m = folium.Map(location=[couche['latitude'].mean(), couche['longitude'].mean()],
+                               zoom_start=6,
+                               tiles='CartoDB positron')
+
+                # Les marqueurs sont créés et regroupés dans le navigateur à partir des colonnes de la couche
+                dessiner_marqueur = """
+                    function (row) {
+                        var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+                            {radius: row[6], color: row[5], fillColor: row[5], fillOpacity: 0.7});
+                        marker.bindPopup('<b>' + row[2] + '</b><br>Région : ' + row[3] + '<br>Offres : ' + row[4]);
+                        return marker;
+                    };
+                """
+                donnees = list(zip(*(couche[colonne].tolist() for colonne in
+                                     ['latitude', 'longitude', 'ville', 'region', 'nb_offres', 'couleur_hex', 'rayon_px'])))
+                FastMarkerCluster(donnees, callback=dessiner_marqueur).add_to(m)
+                folium_static(m)
             
             # Ajouter des métriques
             col1, col2, col3 = st.columns(3)
@@ -797,31 +841,40 @@ def afficher_analyse_temporelle_geographique(df_geo_data):
 
 ##############################################
 # Fonction pour télécharger un fichier depuis une URL
-@st.cache_data(show_spinner="Téléchargement du fichier...")
-def download_file_from_url(url):
+def download_file_from_url(url, colonnes=None):
     """
     Télécharge un fichier depuis une URL (GitHub, Raw, etc.)
+    Les CSV sont lus par blocs au fil du téléchargement, sans garder toute la réponse en mémoire
+    colonnes : colonnes des offres à charger (voir lire_offres_csv) ; toutes les colonnes sinon
+    Pas de cache ici : le résultat est gardé dans le cache des calculs sous l'empreinte de l'URL
     """
     try:
-        response = requests.get(url)
+        response = requests.get(url, stream=True)
         response.raise_for_status()
+        response.raw.decode_content = True
         
         # Vérifier le type de contenu
         content_type = response.headers.get('content-type', '')
         
         if 'text/csv' in content_type or url.endswith('.csv'):
-            return pd.read_csv(io.StringIO(response.text))
+            if colonnes is not None:
+                return lire_offres_csv(response.raw, colonnes=colonnes)
+            return pd.read_csv(response.raw)
         elif 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' in content_type or url.endswith('.xlsx'):
             return pd.read_excel(io.BytesIO(response.content))
         elif 'application/vnd.ms-excel' in content_type or url.endswith('.xls'):
             return pd.read_excel(io.BytesIO(response.content))
         else:
             # Essayer de deviner le format
+            contenu = io.BytesIO(response.content)
             try:
-                return pd.read_csv(io.StringIO(response.text))
+                if colonnes is not None:
+                    return lire_offres_csv(contenu, colonnes=colonnes)
+                return pd.read_csv(contenu)
             except:
                 try:
-                    return pd.read_excel(io.BytesIO(response.content))
+                    contenu.seek(0)
+                    return pd.read_excel(contenu)
                 except:
                     st.error("Format de fichier non supporté")
                     return None
@@ -833,10 +886,40 @@ def download_file_from_url(url):
         st.error(f"Erreur lors de la lecture du fichier: {str(e)}")
         return None
 
+# Fonction pour charger les offres depuis un dossier Parquet partitionné
+def charger_offres_parquet(dossier, origines, mois_debut):
+    """
+    Charge uniquement les partitions (origine, mois) et les colonnes utiles au dashboard
+    """
+    return lire_offres_parquet(dossier, colonnes=COLONNES_DASHBOARD, origines=origines,
+                               mois_debut=mois_debut or None)
+
+# Fonction pour charger les offres depuis la base SQLite (filtres appliqués en SQL)
+def charger_offres_sqlite(fichier, origines, date_debut, date_fin):
+    """
+    Charge les offres de la base SQLite, filtrées par la base sur l'origine et la date de publication
+    """
+    return lire_offres_sqlite(fichier, colonnes=COLONNES_DASHBOARD, origines=origines,
+                              date_debut=date_debut, date_fin=date_fin)
+
+# Fonction pour charger le jeu produit par normalisation.py (dates typées, lieux et contrats déjà découpés)
+def charger_offres_normalisees(dossier):
+    """
+    Charge la table des offres du jeu normalisé, prête pour l'analyse
+    """
+    return lire_jeu_normalise(dossier, colonnes=COLONNES_DASHBOARD)['offres']
+
+# Cache des calculs partagé par toutes les sessions (borné en mémoire)
+@st.cache_resource
+def obtenir_cache_calculs():
+    return CacheCalculs(taille_max_mo=TAILLE_CACHE_MO)
+
+cache_calculs = obtenir_cache_calculs()
+
 methode_chargement1 = st.sidebar.radio(
     "Choisir la méthode de chargement",
-    ["📤 Upload fichier", "🔗 Lien URL (Google Sheets)"],
-    help="Uploader un fichier CSV ou fournir un lien vers un fichier"
+    ["📤 Upload fichier", "🔗 Lien URL (Google Sheets)", "🗂️ Dossier Parquet", "🗄️ Base SQLite", "✨ Jeu normalisé"],
+    help="Uploader un fichier CSV, fournir un lien vers un fichier ou lire le stockage des scrapers (Parquet, SQLite, jeu normalisé)"
 )
 
 # Interface de téléchargement de fichier
@@ -852,6 +935,25 @@ url_file = st.sidebar.text_input(
     placeholder="https://example.com/data.csv ou https://raw.githubusercontent.com/...",
     help="Collez l'URL directe vers le fichier CSV"
 )
+if methode_chargement1 == "🗂️ Dossier Parquet":
+    dossier_parquet = st.sidebar.text_input("Dossier Parquet des offres", value="offres_parquet")
+    origines_choisies = st.sidebar.multiselect("Sources à charger", origines_parquet(dossier_parquet),
+                                               help="Toutes les sources si vide")
+    mois_debut_parquet = st.sidebar.text_input("Charger à partir du mois (AAAA-MM)", placeholder="2025-01")
+if methode_chargement1 == "🗄️ Base SQLite":
+    fichier_sqlite = st.sidebar.text_input("Base SQLite des offres", value="offres.db")
+    if not base_sqlite_disponible(fichier_sqlite):
+        st.sidebar.error(f"Base SQLite introuvable ou sans table offres : {fichier_sqlite}")
+    origines_sqlite_choisies = st.sidebar.multiselect("Sources à charger", origines_sqlite(fichier_sqlite),
+                                                      help="Toutes les sources si vide")
+    col_debut_sql, col_fin_sql = st.sidebar.columns(2)
+    with col_debut_sql:
+        date_debut_sqlite = st.date_input("Publiées depuis", value=None)
+    with col_fin_sql:
+        date_fin_sqlite = st.date_input("Publiées jusqu'au", value=None)
+if methode_chargement1 == "✨ Jeu normalisé":
+    dossier_normalise = st.sidebar.text_input("Dossier du jeu normalisé", value="offres_normalisees",
+                                              help="Produit par : python normalisation.py")
 lien_csv1 = "https://docs.google.com/spreadsheets/d/e/2PACX-1vSU1mojHq05cj76KcgVpFCjgV4tHvdRNb0FEtf24REhpsLI8nNFeeDZhoObdEAUCKWoZ7H6Q0ocWotV/pub?gid=127079054&single=true&output=csv"
 st.sidebar.header("Liens prédéfinis à copier-coller")
 st.sidebar.code(lien_csv1, language="text")
@@ -886,6 +988,12 @@ if methode_chargement1 =="📤 Upload fichier" :
     fichier_charge1 = uploaded_geo_file
 elif methode_chargement1 =="🔗 Lien URL (Google Sheets)":
     fichier_charge1 = url_file
+elif methode_chargement1 == "🗂️ Dossier Parquet":
+    fichier_charge1 = dossier_parquet
+elif methode_chargement1 == "🗄️ Base SQLite":
+    fichier_charge1 = fichier_sqlite
+elif methode_chargement1 == "✨ Jeu normalisé":
+    fichier_charge1 = dossier_normalise
 else:
     st.error("Veuillez sélectionner une méthode de chargement valide.")
     
@@ -901,8 +1009,43 @@ else:
 if fichier_charge1 is not None:
     try:
         # Charger les données
-        df = pd.read_csv(fichier_charge1)
-        df_temporal = prepare_temporal_dataframe(df)
+        def charger_offres():
+            if methode_chargement1 == "🗂️ Dossier Parquet":
+                return charger_offres_parquet(fichier_charge1, tuple(origines_choisies), mois_debut_parquet)
+            elif methode_chargement1 == "🗄️ Base SQLite":
+                if not base_sqlite_disponible(fichier_charge1):
+                    st.error(f"Base SQLite introuvable ou sans table offres : {fichier_charge1}. "
+                             "Lancez d'abord le scraping avec --sqlite.")
+                    st.stop()
+                return charger_offres_sqlite(fichier_charge1, tuple(origines_sqlite_choisies),
+                                             date_debut_sqlite, date_fin_sqlite)
+            elif methode_chargement1 == "✨ Jeu normalisé":
+                return charger_offres_normalisees(fichier_charge1)
+            # CSV déposé ou en ligne : lecture par blocs des seules colonnes utilisées
+            if isinstance(fichier_charge1, str) and fichier_charge1.startswith(('http://', 'https://')):
+                df_url = download_file_from_url(fichier_charge1, colonnes=COLONNES_DASHBOARD)
+                if df_url is None:
+                    # L'erreur a déjà été affichée par download_file_from_url
+                    st.stop()
+                return df_url
+            return lire_offres_csv(fichier_charge1, colonnes=COLONNES_DASHBOARD)
+        
+        # L'empreinte identifie le jeu chargé : elle préfixe toutes les clés du cache des calculs
+        if methode_chargement1 == "🗂️ Dossier Parquet":
+            parametres_chargement = (tuple(origines_choisies), mois_debut_parquet)
+        elif methode_chargement1 == "🗄️ Base SQLite":
+            parametres_chargement = (tuple(origines_sqlite_choisies), date_debut_sqlite, date_fin_sqlite)
+        else:
+            parametres_chargement = ()
+        empreinte = (methode_chargement1, empreinte_source(fichier_charge1)) + parametres_chargement
+        
+        with st.spinner("Préparation des données..."):
+            df_temporal, valeurs_multiples, cube_offres = cache_calculs.obtenir(
+                ('temporel', empreinte), lambda: prepare_temporal_dataframe(charger_offres())
+            )
+        cube = cube_offres['cube']
+        groupes_lieux = cube_offres['lieux']
+        groupes_contrats = cube_offres['contrats']
         
         st.success(f"✅ Données chargées avec succès ! {len(df_temporal)} offres analysables")
         
@@ -919,7 +1062,12 @@ if fichier_charge1 is not None:
         if fichier_charge2 is not None:
             try:
                 # Charger les données géographiques
-                df_villes_regions = pd.read_csv(fichier_charge2)
+                empreinte_geo = empreinte_source(fichier_charge2)
+                def charger_villes_regions():
+                    if hasattr(fichier_charge2, 'seek'):
+                        fichier_charge2.seek(0)
+                    return pd.read_csv(fichier_charge2)
+                df_villes_regions = cache_calculs.obtenir(('villes_regions', empreinte_geo), charger_villes_regions)
                 
                 # Vérifier que le fichier contient les colonnes attendues
                 ##########################################################""""
@@ -930,7 +1078,11 @@ if fichier_charge1 is not None:
                     st.success(f"✅ Fichier géographique chargé avec succès ! {len(df_villes_regions)} villes-régions")
                     # Préparer les données géographiques avec la fonction corrigée
                     with st.spinner("Préparation des analyses géographiques..."):
-                        df_geo_data = prepare_geographic_dataframe(df_temporal, df_villes_regions)
+                        df_geo_data = cache_calculs.obtenir(
+                            ('geo', empreinte, empreinte_geo),
+                            lambda: prepare_geographic_dataframe(df_temporal, df_villes_regions,
+                                                                 valeurs_multiples.get('lieu'))
+                        )
                     st.success("✅ Analyses géographiques prêtes !")
                     # Afficher les insights géographiques
                     st.subheader("📊 Insights Géographiques")
@@ -975,38 +1127,41 @@ if fichier_charge1 is not None:
         
         # Filtres conditionnels selon le type d'analyse
         if periode_analyse == "Par année":
-            annees_disponibles = sorted(df_temporal['annee_publication'].unique())
+            annees_disponibles = sorted(cube['annee_publication'].unique())
             annee_selectionnee = st.sidebar.selectbox("Choisir l'année", annees_disponibles)
-            df_filtre = df_temporal[df_temporal['annee_publication'] == annee_selectionnee]
+            filtre_periode = lambda t: t['annee_publication'] == annee_selectionnee
+            etat_periode = (periode_analyse, annee_selectionnee)
             titre_periode = f"Année {annee_selectionnee}"
             
         elif periode_analyse == "Par mois spécifique":
             col1, col2 = st.sidebar.columns(2)
             with col1:
-                annee_mois = st.selectbox("Année", sorted(df_temporal['annee_publication'].unique()))
+                annee_mois = st.selectbox("Année", sorted(cube['annee_publication'].unique()))
             with col2:
                 mois_noms = ['Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin',
                             'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre']
                 mois_nom = st.selectbox("Mois", mois_noms)
                 mois_num = mois_noms.index(mois_nom) + 1
             
-            df_filtre = df_temporal[
-                (df_temporal['annee_publication'] == annee_mois) & 
-                (df_temporal['mois_publication'] == mois_num)
-            ]
+            filtre_periode = lambda t: (
+                (t['annee_publication'] == annee_mois) & 
+                (t['mois_publication'] == mois_num)
+            )
+            etat_periode = (periode_analyse, annee_mois, mois_num)
             titre_periode = f"{mois_nom} {annee_mois}"
             
         elif periode_analyse == "Par trimestre":
             col1, col2 = st.sidebar.columns(2)
             with col1:
-                annee_trim = st.selectbox("Année", sorted(df_temporal['annee_publication'].unique()))
+                annee_trim = st.selectbox("Année", sorted(cube['annee_publication'].unique()))
             with col2:
                 trimestre = st.selectbox("Trimestre", [1, 2, 3, 4])
             
-            df_filtre = df_temporal[
-                (df_temporal['annee_publication'] == annee_trim) & 
-                (df_temporal['trimestre_publication'] == trimestre)
-            ]
+            filtre_periode = lambda t: (
+                (t['annee_publication'] == annee_trim) & 
+                (t['trimestre_publication'] == trimestre)
+            )
+            etat_periode = (periode_analyse, annee_trim, trimestre)
             titre_periode = f"T{trimestre} {annee_trim}"
             
         elif periode_analyse == "Par période personnalisée":
@@ -1016,64 +1171,86 @@ if fichier_charge1 is not None:
             with col2:
                 date_fin = st.date_input("Date fin", value=date_max, min_value=date_min, max_value=date_max)
             
-            df_filtre = df_temporal[
-                (df_temporal['date_publication'].dt.date >= date_debut) & 
-                (df_temporal['date_publication'].dt.date <= date_fin)
-            ]
+            filtre_periode = lambda t: (
+                (t['date_publication'].dt.date >= date_debut) & 
+                (t['date_publication'].dt.date <= date_fin)
+            )
+            etat_periode = (periode_analyse, date_debut, date_fin)
             titre_periode = f"Du {date_debut} au {date_fin}"
             
         elif periode_analyse == "Comparaison d'années":
-            annees_disponibles = sorted(df_temporal['annee_publication'].unique())
+            annees_disponibles = sorted(cube['annee_publication'].unique())
             annees_comparaison = st.sidebar.multiselect(
                 "Choisir les années à comparer", 
                 annees_disponibles, 
                 default=annees_disponibles[-2:] if len(annees_disponibles) >= 2 else annees_disponibles
             )
-            df_filtre = df_temporal[df_temporal['annee_publication'].isin(annees_comparaison)]
+            filtre_periode = lambda t: t['annee_publication'].isin(annees_comparaison)
+            etat_periode = (periode_analyse, tuple(annees_comparaison))
             titre_periode = f"Comparaison {', '.join(map(str, annees_comparaison))}"
             
         else:  # Vue d'ensemble
-            df_filtre = df_temporal.copy()
+            filtre_periode = lambda t: pd.Series(True, index=t.index)
+            etat_periode = (periode_analyse,)
             titre_periode = "Toute la période"
         
+        # Chaque étape de filtrage est mise en cache avec l'état des filtres dont elle dépend
+        cle_periode = (empreinte, etat_periode)
+        cube_filtre = cache_calculs.obtenir(('periode',) + cle_periode, lambda: cube[filtre_periode(cube)])
+        
         # === FILTRES ADDITIONNELS ===
         st.sidebar.subheader("🔍 Filtres additionnels")
         
-        # Filtre par lieu - avec gestion des valeurs multiples
-        if 'lieu' in df_filtre.columns:
+        # Filtre par lieu - avec gestion des valeurs multiples (ensembles de lieux du cube)
+        lieux_selectionnes = []
+        if 'lieu' in valeurs_multiples:
             # Extraire tous les lieux uniques
-            tous_lieux = set()
-            for lieux in df_filtre['lieu'].dropna():
-                if isinstance(lieux, list):
-                    tous_lieux.update(lieux)
-                else:
-                    tous_lieux.add(lieux)
-            
-            lieux_disponibles = sorted(tous_lieux)
+            lieux_disponibles = cache_calculs.obtenir(('lieux_disponibles',) + cle_periode, lambda: sorted(
+                valeurs_presentes(cube_filtre, groupes_lieux, 'id_lieux').unique().tolist()))
             lieux_selectionnes = st.sidebar.multiselect("Filtrer par lieu", lieux_disponibles)
             
             if lieux_selectionnes:
-                df_filtre = df_filtre[df_filtre['lieu'].apply(
-                    lambda x: any(lieu in x for lieu in lieux_selectionnes) if isinstance(x, list) else x in lieux_selectionnes
-                )]
+                cube_filtre = cache_calculs.obtenir(
+                    ('filtre_lieux',) + cle_periode + (tuple(lieux_selectionnes),),
+                    lambda: filtrer_valeurs(cube_filtre, groupes_lieux, 'id_lieux', lieux_selectionnes))
+        cle_lieux = cle_periode + (tuple(lieux_selectionnes),)
         
-        # Filtre par type de contrat - avec gestion des valeurs multiples
-        if 'type_contrat' in df_filtre.columns:
+        # Filtre par type de contrat - avec gestion des valeurs multiples (ensembles de contrats du cube)
+        contrat_selectionne = []
+        if 'type_contrat' in valeurs_multiples:
             # Extraire tous les types de contrat uniques
-            tous_contrats = set()
-            for contrats in df_filtre['type_contrat'].dropna():
-                if isinstance(contrats, list):
-                    tous_contrats.update(contrats)
-                else:
-                    tous_contrats.add(contrats)
-            
-            contrats_disponibles = sorted(tous_contrats)
+            contrats_disponibles = cache_calculs.obtenir(('contrats_disponibles',) + cle_lieux, lambda: sorted(
+                valeurs_presentes(cube_filtre, groupes_contrats, 'id_contrats').unique().tolist()))
             contrat_selectionne = st.sidebar.multiselect("Filtrer par type de contrat", contrats_disponibles)
             
             if contrat_selectionne:
-                df_filtre = df_filtre[df_filtre['type_contrat'].apply(
-                    lambda x: any(contrat in x for contrat in contrat_selectionne) if isinstance(x, list) else x in contrat_selectionne
-                )]
+                cube_filtre = cache_calculs.obtenir(
+                    ('filtre_contrats',) + cle_lieux + (tuple(contrat_selectionne),),
+                    lambda: filtrer_valeurs(cube_filtre, groupes_contrats, 'id_contrats', contrat_selectionne))
+        cle_filtre = cle_lieux + (tuple(contrat_selectionne),)
+        
+        nb_offres_filtre = int(cube_filtre['nb_offres'].sum())
+        
+        # Agrégats des graphiques, mis en cache avec l'état complet des filtres
+        def vue(nom, calcul):
+            return cache_calculs.obtenir((nom,) + cle_filtre, calcul)
+        
+        # Offres brutes filtrées, utilisées uniquement par l'onglet des données brutes
+        def filtrer_offres():
+            offres = df_temporal[filtre_periode(df_temporal)]
+            if lieux_selectionnes:
+                offres = filtrer_valeurs(offres, groupes_lieux, 'id_lieux', lieux_selectionnes)
+            if contrat_selectionne:
+                offres = filtrer_valeurs(offres, groupes_contrats, 'id_contrats', contrat_selectionne)
+            # Les identifiants d'ensembles du cube ne sont pas des données de l'offre
+            return offres.drop(columns=['id_lieux', 'id_contrats'])
+        
+        with st.sidebar.expander("⚙️ Cache des calculs"):
+            etat_cache = cache_calculs.etat()
+            st.caption(f"{etat_cache['entrees']} résultats, {etat_cache['taille_mo']} Mo / {TAILLE_CACHE_MO} Mo "
+                       f"({etat_cache['succes']} réutilisations, {etat_cache['echecs']} calculs)")
+            if st.button("Vider le cache"):
+                cache_calculs.vider()
         
         # === AFFICHAGE DES RÉSULTATS ===
         st.header(f"📈 Analyse pour : {titre_periode}")
@@ -1082,32 +1259,26 @@ if fichier_charge1 is not None:
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("📋 Total offres", len(df_filtre))
+            st.metric("📋 Total offres", nb_offres_filtre)
             st.caption("Nombre total d'offres d'emploi dans la période sélectionnée")
         
         with col2:
-            if 'compagnie' in df_filtre.columns:
-                nb_entreprises = df_filtre['compagnie'].nunique()
+            if 'compagnie' in df_temporal.columns:
+                nb_entreprises = cube_filtre['compagnie'].nunique()
                 st.metric("🏢 Entreprises", nb_entreprises)
                 st.caption("Nombre d'entreprises différentes publiant des offres")
         
         with col3:
-            if 'lieu' in df_filtre.columns:
-                # Compter les lieux uniques (en prenant en compte les listes)
-                tous_lieux = set()
-                for lieux in df_filtre['lieu'].dropna():
-                    if isinstance(lieux, list):
-                        tous_lieux.update(lieux)
-                    else:
-                        tous_lieux.add(lieux)
-                nb_lieux = len(tous_lieux)
+            if 'lieu' in valeurs_multiples:
+                # Compter les lieux uniques (en prenant en compte les valeurs multiples)
+                nb_lieux = valeurs_presentes(cube_filtre, groupes_lieux, 'id_lieux').nunique()
                 st.metric("📍 Lieux", nb_lieux)
                 st.caption("Nombre de lieux de travail différents mentionnés")
         
         with col4:
-            duree_moyenne = df_filtre['duree_validite_jours'].mean()
-            if not pd.isna(duree_moyenne):
-                st.metric("⏱️ Durée moy. validité", f"{duree_moyenne:.0f} jours")
+            duree_moy = duree_moyenne(cube_filtre)
+            if not pd.isna(duree_moy):
+                st.metric("⏱️ Durée moy. validité", f"{duree_moy:.0f} jours")
                 st.caption("Durée moyenne de validité des offres (jours)")
             else:
                 st.metric("⏱️ Durée moy. validité", "N/A")
@@ -1127,7 +1298,7 @@ if fichier_charge1 is not None:
             with col1:
                 st.subheader("📊 Évolution mensuelle")
                 st.caption("Nombre d'offres publiées par mois - Permet d'identifier les tendances saisonnières")
-                df_mensuel = df_filtre.groupby(df_filtre['date_publication'].dt.to_period('M')).size().reset_index()
+                df_mensuel = vue('mensuel', lambda: sommer(cube_filtre, cube_filtre['date_publication'].dt.to_period('M')).reset_index())
                 df_mensuel.columns = ['mois', 'nb_offres']
                 df_mensuel['mois_str'] = df_mensuel['mois'].astype(str)
                 
@@ -1147,7 +1318,7 @@ if fichier_charge1 is not None:
                 st.subheader("📅 Répartition par jour de la semaine")
                 st.caption("Distribution des publications selon les jours de la semaine - Permet d'identifier les jours les plus actifs")
                 jour_ordre = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-                df_jour = df_filtre['jour_semaine_publication'].value_counts().reindex(jour_ordre)
+                df_jour = vue('jour_semaine', lambda: sommer(cube_filtre, 'jour_semaine_publication').reindex(jour_ordre))
                 
                 fig_jour = px.bar(
                     x=df_jour.index, y=df_jour.values,
@@ -1173,7 +1344,7 @@ if fichier_charge1 is not None:
             with col1:
                 st.subheader(f"📊 Évolution mensuelle - {annee_selectionnee}")
                 st.caption(f"Répartition mensuelle des offres pour l'année {annee_selectionnee}")
-                df_mois_annee = df_filtre.groupby('mois_publication').size().reset_index()
+                df_mois_annee = vue('mois', lambda: sommer(cube_filtre, 'mois_publication').reset_index())
                 df_mois_annee.columns = ['mois', 'nb_offres']
                 mois_noms = ['Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Jun',
                             'Jul', 'Aoû', 'Sep', 'Oct', 'Nov', 'Déc']
@@ -1193,9 +1364,7 @@ if fichier_charge1 is not None:
             with col2:
                 st.subheader("📈 Moyenne par jour du mois")
                 st.caption(f"Nombre moyen d'offres publiées chaque jour du mois pour {annee_selectionnee}")
-                df_filtre_copy = df_filtre.copy()
-                df_filtre_copy['jour'] = df_filtre_copy['date_publication'].dt.day
-                moyenne_par_jour = df_filtre_copy.groupby('jour').size().reset_index()
+                moyenne_par_jour = vue('jour_mois', lambda: sommer(cube_filtre, 'jour_publication').reset_index())
                 moyenne_par_jour.columns = ['jour', 'nb_offres']
                 
                 fig_jour_mois = px.line(
@@ -1226,21 +1395,22 @@ if fichier_charge1 is not None:
             
             with col1:
                 st.write("**Mois le plus actif:**")
-                mois_max = df_filtre.groupby('nom_mois').size().idxmax()
-                nb_offres_max = df_filtre.groupby('nom_mois').size().max()
+                offres_par_mois = vue('nom_mois', lambda: sommer(cube_filtre, 'nom_mois'))
+                mois_max = offres_par_mois.idxmax()
+                nb_offres_max = offres_par_mois.max()
                 st.info(f"{mois_max} ({nb_offres_max} offres)")
                 st.caption("Mois avec le plus grand nombre d'offres publiées")
             
             with col2:
                 st.write("**Moyenne par mois:**")
-                moyenne_mensuelle = len(df_filtre) / df_filtre['mois_publication'].nunique()
+                moyenne_mensuelle = nb_offres_filtre / cube_filtre['mois_publication'].nunique()
                 st.info(f"{moyenne_mensuelle:.1f} offres/mois")
                 st.caption("Nombre moyen d'offres publiées par mois")
             
             with col3:
                 st.write("**Moyenne par jour:**")
-                nb_jours = (df_filtre['date_publication'].max() - df_filtre['date_publication'].min()).days + 1
-                moyenne_quotidienne = len(df_filtre) / nb_jours
+                nb_jours = (cube_filtre['date_publication'].max() - cube_filtre['date_publication'].min()).days + 1
+                moyenne_quotidienne = nb_offres_filtre / nb_jours
                 st.info(f"{moyenne_quotidienne:.2f} offres/jour")
                 st.caption("Nombre moyen d'offres publiées par jour")
         
@@ -1257,7 +1427,7 @@ if fichier_charge1 is not None:
             with col1:
                 st.subheader(f"📅 Offres par jour - {titre_periode}")
                 st.caption(f"Répartition journalière des offres pour {mois_nom} {annee_mois}")
-                df_jours = df_filtre.groupby('jour_publication').size().reset_index()
+                df_jours = vue('jour_mois', lambda: sommer(cube_filtre, 'jour_publication').reset_index())
                 df_jours.columns = ['jour', 'nb_offres']
                 
                 fig_jours = px.bar(
@@ -1285,8 +1455,8 @@ if fichier_charge1 is not None:
             with col2:
                 st.subheader("🏢 Top entreprises du mois")
                 st.caption(f"Entreprises ayant publié le plus d'offres en {mois_nom} {annee_mois}")
-                if 'compagnie' in df_filtre.columns:
-                    top_entreprises = df_filtre['compagnie'].value_counts().head(10)
+                if 'compagnie' in df_temporal.columns:
+                    top_entreprises = vue('top_entreprises', lambda: top_compagnies(cube_filtre))
                     fig_entreprises = px.bar(
                         x=top_entreprises.values, y=top_entreprises.index,
                         orientation='h',
@@ -1310,7 +1480,7 @@ if fichier_charge1 is not None:
             st.subheader("📊 Comparaison par années")
             st.caption("Évolution mensuelle comparée entre les années sélectionnées")
             
-            df_annees = df_filtre.groupby(['annee_publication', 'mois_publication']).size().reset_index()
+            df_annees = vue('annees', lambda: sommer(cube_filtre, ['annee_publication', 'mois_publication']).reset_index())
             df_annees.columns = ['annee', 'mois', 'nb_offres']
             
             fig_comparaison = px.line(
@@ -1327,12 +1497,20 @@ if fichier_charge1 is not None:
             # Tableau comparatif
             st.subheader("📋 Tableau comparatif")
             st.caption("Statistiques comparées entre les années sélectionnées")
-            pivot_annees = df_filtre.groupby('annee_publication').agg({
-                'lien': 'count',
-                'compagnie': 'nunique' if 'compagnie' in df_filtre.columns else lambda x: 0,
-                'lieu': 'nunique' if 'lieu' in df_filtre.columns else lambda x: 0,
-                'duree_validite_jours': 'mean'
-            }).round(2)
+            def calculer_pivot_annees():
+                pivot_annees = cube_filtre.groupby('annee_publication').agg({
+                    'nb_offres': 'sum',
+                    'compagnie': 'nunique' if 'compagnie' in df_temporal.columns else lambda x: 0,
+                    'somme_duree': 'sum',
+                    'nb_duree': 'sum'
+                })
+                # Lieux distincts par année, à partir des ensembles de lieux du cube
+                ensembles_annees = cube_filtre[['annee_publication', 'id_lieux']].drop_duplicates()
+                lieux_annees = ensembles_annees.merge(groupes_lieux.rename('lieu'), left_on='id_lieux', right_index=True)
+                pivot_annees.insert(2, 'lieu', lieux_annees.groupby('annee_publication')['lieu'].nunique())
+                pivot_annees['duree_validite_jours'] = pivot_annees['somme_duree'] / pivot_annees['nb_duree'].replace(0, np.nan)
+                return pivot_annees.drop(columns=['somme_duree', 'nb_duree']).fillna({'lieu': 0}).round(2)
+            pivot_annees = vue('pivot_annees', calculer_pivot_annees)
             
             pivot_annees.columns = ['Nb offres', 'Nb entreprises', 'Nb lieux', 'Durée moy. validité']
             st.dataframe(pivot_annees)
@@ -1350,9 +1528,9 @@ if fichier_charge1 is not None:
         with tab1:
             st.subheader("🗓️ Heatmap des publications")
             st.caption("Visualisation heatmap montrant l'intensité des publications par mois et jour de la semaine")
-            if len(df_filtre) > 0:
+            if nb_offres_filtre > 0:
                 # Créer une heatmap jour/mois
-                df_heatmap = df_filtre.groupby(['mois_publication', 'jour_semaine_publication']).size().reset_index()
+                df_heatmap = vue('heatmap', lambda: sommer(cube_filtre, ['mois_publication', 'jour_semaine_publication']).reset_index())
                 df_heatmap.columns = ['mois', 'jour_semaine', 'nb_offres']
                 
                 pivot_heatmap = df_heatmap.pivot(index='mois', columns='jour_semaine', values='nb_offres').fillna(0)
@@ -1390,10 +1568,10 @@ if fichier_charge1 is not None:
             col1, col2 = st.columns(2)
             
             with col1:
-                if 'compagnie' in df_filtre.columns:
+                if 'compagnie' in df_temporal.columns:
                     st.subheader("🏢 Top 10 entreprises")
                     st.caption("Entreprises ayant publié le plus d'offres")
-                    top_entreprises = df_filtre['compagnie'].value_counts().head(10)
+                    top_entreprises = vue('top_entreprises', lambda: top_compagnies(cube_filtre))
                     st.dataframe(top_entreprises.reset_index())
                     
                     # Interprétation
@@ -1401,12 +1579,11 @@ if fichier_charge1 is not None:
                         st.markdown(interpreter_top_entreprises(top_entreprises, titre_periode))
             
             with col2:
-                if 'lieu' in df_filtre.columns:
+                if 'lieu' in valeurs_multiples:
                     st.subheader("📍 Top 10 lieux")
                     st.caption("Lieux les plus fréquemment mentionnés dans les offres")
-                    # Pour les lieux, nous devons exploser les listes
-                    df_lieux_exploded = df_filtre.explode('lieu')
-                    top_lieux = df_lieux_exploded['lieu'].value_counts().head(10)
+                    # Mentions par lieu : une offre à plusieurs lieux compte pour chacun
+                    top_lieux = vue('top_lieux', lambda: compter_valeurs(cube_filtre, groupes_lieux, 'id_lieux').head(10))
                     st.dataframe(top_lieux.reset_index())
                     
                     # Interprétation
@@ -1430,8 +1607,8 @@ if fichier_charge1 is not None:
             st.caption("Tendances temporelles avec moyenne mobile pour identifier les patterns à long terme")
             
             # Calcul de la tendance
-            if len(df_filtre) > 30:  # Assez de données pour une tendance
-                df_tendance = df_filtre.groupby(df_filtre['date_publication'].dt.date).size().reset_index()
+            if nb_offres_filtre > 30:  # Assez de données pour une tendance
+                df_tendance = vue('tendance', lambda: sommer(cube_filtre, cube_filtre['date_publication'].dt.date).reset_index())
                 df_tendance.columns = ['date', 'nb_offres']
                 
                 # Moyenne mobile sur 7 jours
@@ -1488,6 +1665,7 @@ if fichier_charge1 is not None:
         with tab4:
             st.subheader("📋 Échantillon des données filtrées")
             st.caption("Aperçu des données brutes après application des filtres")
+            df_filtre = cache_calculs.obtenir(('offres_filtrees',) + cle_filtre, filtrer_offres)
             st.dataframe(df_filtre.head(100))
             
             # Bouton de téléchargement
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# Fonction permettant d'estimer la mémoire occupée par un résultat mis en cache
+def taille_objet(valeur):
+    if isinstance(valeur, pd.DataFrame):
+        return int(valeur.memory_usage(deep=True, index=True).sum())
+    if isinstance(valeur, (pd.Series, pd.Index)):
+        return int(valeur.memory_usage(deep=True))
+    if isinstance(valeur, dict):
+        return sys.getsizeof(valeur) + sum(taille_objet(element) for element in valeur.values())
+    if isinstance(valeur, (list, tuple)):
+        return sys.getsizeof(valeur) + sum(taille_objet(element) for element in valeur)
+    return sys.getsizeof(valeur)
+
+
+# Fonction permettant de copier un résultat sans dupliquer ses données
+def copie_legere(valeur):
+    # Les DataFrames renvoyés peuvent être modifiés par l'appelant (colonnes renommées, ajoutées...) :
+    # une copie superficielle protège l'entrée du cache sans recopier les données
+    if isinstance(valeur, (pd.DataFrame, pd.Series)):
+        return valeur.copy(deep=False)
+    if isinstance(valeur, dict):
+        return {cle: copie_legere(element) for cle, element in valeur.items()}
+    if isinstance(valeur, (list, tuple)):
+        return type(valeur)(copie_legere(element) for element in valeur)
+    return valeur
+
+
+# Fonction permettant de calculer l'empreinte d'une source de données
+def empreinte_source(source):
+    """
+    Empreinte courte d'un fichier déposé (contenu), d'un fichier ou dossier local (noms, tailles et
+    dates de modification) ou d'une URL. Elle change dès que les données changent.
+    """
+    empreinte = hashlib.sha1()
+    if hasattr(source, 'getvalue'):
+        empreinte.update(source.getvalue())
+    elif isinstance(source, str) and os.path.isdir(source):
+        for dossier, _, fichiers in sorted(os.walk(source)):
+            for fichier in sorted(fichiers):
+                statut = os.stat(os.path.join(dossier, fichier))
+                empreinte.update(f"{dossier}/{fichier}:{statut.st_size}:{statut.st_mtime_ns};".encode())
+    elif isinstance(source, str) and os.path.isfile(source):
+        # Une base SQLite en mode WAL écrit d'abord dans le fichier -wal : le fichier principal
+        # ne change qu'au prochain checkpoint
+        for fichier in (source, source + '-wal'):
+            if os.path.exists(fichier):
+                statut = os.stat(fichier)
+                empreinte.update(f"{fichier}:{statut.st_size}:{statut.st_mtime_ns};".encode())
+    else:
+        empreinte.update(repr(source).encode())
+    return empreinte.hexdigest()[:16]
+
+
+#Cache des calculs du dashboard
+class CacheCalculs:
+    """
+    Cache LRU borné en mémoire. Chaque étape du dashboard y range son résultat sous une clé
+    (étape, empreinte des données, état des filtres dont elle dépend) : changer un filtre ne
+    recalcule que les étapes qui en dépendent. Les entrées les moins récemment utilisées sont
+    évincées dès que la taille totale dépasse le budget.
+
+    :param taille_max_mo: Budget mémoire du cache en Mo
+    """
+    def __init__(self, taille_max_mo=512):
+        self.taille_max = taille_max_mo * 1024 * 1024
+        self.taille = 0
+        self.succes = 0
+        self.echecs = 0
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def obtenir(self, cle, calcul):
+        with self._verrou:
+            if cle in self._entrees:
+                self._entrees.move_to_end(cle)
+                self.succes += 1
+                return copie_legere(self._entrees[cle][0])
+            self.echecs += 1
+
+        valeur = calcul()
+        taille = taille_objet(valeur)
+        with self._verrou:
+            # Un résultat plus gros que tout le budget n'est pas gardé
+            if taille <= self.taille_max:
+                if cle in self._entrees:
+                    self.taille -= self._entrees.pop(cle)[1]
+                self._entrees[cle] = (valeur, taille)
+                self.taille += taille
+                while self.taille > self.taille_max:
+                    _, (_, taille_evincee) = self._entrees.popitem(last=False)
+                    self.taille -= taille_evincee
+        return copie_legere(valeur)
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+            self.taille = 0
+
+    def etat(self):
+        return {'entrees': len(self._entrees), 'taille_mo': round(self.taille / 1024 / 1024, 1),
+                'succes': self.succes, 'echecs': self.echecs}
@@ -0,0 +1,196 @@
+from functools import lru_cache
+
+import soupsieve
+from bs4 import BeautifulSoup, FeatureNotFound, NavigableString
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    from cssselect import GenericTranslator
+    TRADUCTEUR_CSS = GenericTranslator()
+    PARSEUR_LXML = lxml_html.HTMLParser(encoding='utf-8')
+except ImportError:
+    TRADUCTEUR_CSS = None
+
+#Analyseur HTML par défaut :
+# - 'lxml' : arbre lxml natif, sélecteurs CSS traduits une fois en XPath compilé (le plus rapide)
+# - 'html5lib', 'html.parser' : BeautifulSoup (html5lib corrige l'arbre comme un navigateur, mais il est lent)
+ANALYSEUR_DEFAUT = 'lxml' if TRADUCTEUR_CSS is not None else 'html.parser'
+
+
+# Fonction permettant de construire l'arbre d'une page HTML
+def analyser_html(html, analyseur=None):
+    analyseur = analyseur or ANALYSEUR_DEFAUT
+    if analyseur == 'lxml' and TRADUCTEUR_CSS is not None:
+        if not html or not html.strip():
+            return lxml_html.document_fromstring('<html></html>')
+        # Le texte est réencodé en UTF-8 : lxml refuse les chaînes qui déclarent leur propre encodage
+        return lxml_html.document_fromstring(html.encode('utf-8'), parser=PARSEUR_LXML)
+    try:
+        return BeautifulSoup(html, analyseur)
+    except FeatureNotFound:
+        # Analyseur absent : on se rabat sur celui intégré à Python
+        return BeautifulSoup(html, 'html.parser')
+
+
+# Fonction permettant de savoir si un élément vient de lxml (sinon de BeautifulSoup)
+def _est_lxml(element):
+    return TRADUCTEUR_CSS is not None and isinstance(element, etree._Element)
+
+
+#Sélecteur CSS compilé pour les deux types d'arbres
+class Selecteur:
+    """
+    :param css: Sélecteur CSS, évalué sur les descendants de l'élément
+    """
+    def __init__(self, css):
+        self.css = css
+        self._soupsieve = soupsieve.compile(css)
+        self._xpath = etree.XPath(TRADUCTEUR_CSS.css_to_xpath(css, prefix='descendant::')) \
+            if TRADUCTEUR_CSS is not None else None
+
+    def select(self, element):
+        return self._xpath(element) if _est_lxml(element) else self._soupsieve.select(element)
+
+    def select_one(self, element):
+        if _est_lxml(element):
+            resultats = self._xpath(element)
+            return resultats[0] if resultats else None
+        return self._soupsieve.select_one(element)
+
+
+# Fonction permettant de ne compiler qu'une fois chaque sélecteur utilisé hors d'un Extracteur
+@lru_cache(maxsize=256)
+def compiler(css):
+    return Selecteur(css)
+
+
+# Fonction permettant de savoir si une page contient un élément (page lxml ou BeautifulSoup)
+def contient(page, css):
+    return page is not None and compiler(css).select_one(page) is not None
+
+
+# Fonction permettant d'obtenir le texte d'un élément qui ne contient qu'un texte (équivalent de .string)
+def _texte_unique(element):
+    if not _est_lxml(element):
+        return element.string
+    if len(element) == 0:
+        return element.text
+    if len(element) == 1 and not element.text and not element[0].tail:
+        return _texte_unique(element[0])
+    return None
+
+
+#Description d'un champ à extraire
+class Champ:
+    """
+    Un champ d'offre décrit une fois pour toutes : d'où vient sa valeur et comment la nettoyer.
+
+    :param selecteur: Sélecteur CSS, relatif à la carte de l'offre (la carte elle-même si absent)
+    :param attribut: Attribut à lire (texte de l'élément par défaut)
+    :param libelle: À la place du sélecteur : texte d'une cellule <td> de la page dont la valeur
+                    est dans la cellule suivante (ex: "Formation initiale")
+    :param texte_suivant: Lire le texte qui suit l'élément au lieu de son contenu
+    :param prefixe: Préfixe ajouté à une valeur non vide (ex: domaine d'un lien relatif)
+    :param nettoyer: Fonction appliquée à la valeur extraite
+    """
+    def __init__(self, selecteur=None, attribut=None, libelle=None, texte_suivant=False, prefixe='', nettoyer=None):
+        self.selecteur = selecteur
+        self.attribut = attribut
+        self.libelle = libelle
+        self.texte_suivant = texte_suivant
+        self.prefixe = prefixe
+        self.nettoyer = nettoyer
+
+    def valeur(self, element):
+        if element is None:
+            valeur = ''
+        elif self.texte_suivant:
+            if _est_lxml(element):
+                valeur = (element.tail or '').strip()
+            else:
+                suivant = element.next_sibling
+                valeur = suivant.strip() if isinstance(suivant, NavigableString) else ''
+        elif self.attribut:
+            valeur = element.get(self.attribut) or ''
+        else:
+            valeur = str(element.text_content() if _est_lxml(element) else element.get_text()).strip()
+        if valeur and self.prefixe:
+            valeur = self.prefixe + valeur
+        return self.nettoyer(valeur) if self.nettoyer is not None else valeur
+
+
+#Extracteur déclaratif d'un site
+class Extracteur:
+    """
+    Extrait les champs des offres d'une page à partir de leur description (voir Champ).
+    Les sélecteurs sont compilés une seule fois à la création, puis chacun est évalué une
+    seule fois par carte. Les champs à libellé sont tous trouvés en un seul passage sur les
+    cellules de la page. Les pages peuvent venir de lxml (rapide) ou de BeautifulSoup.
+
+    :param champs: Dictionnaire nom du champ -> Champ
+    :param carte: Sélecteur CSS des cartes d'offres (la page entière est une offre si absent)
+    """
+    def __init__(self, champs, carte=None):
+        self.champs = champs
+        self.carte = Selecteur(carte) if carte else None
+        self._selecteurs = {nom: Selecteur(champ.selecteur) if champ.selecteur else None
+                            for nom, champ in champs.items() if not champ.libelle}
+        self._libelles = {nom: champ.libelle for nom, champ in champs.items() if champ.libelle}
+        if self._libelles:
+            self._cellules = Selecteur('td')
+            self._cellule_suivante = etree.XPath('following-sibling::td[1]') if TRADUCTEUR_CSS is not None else None
+
+    def cartes(self, page):
+        if page is None:
+            return []
+        if self.carte is None:
+            return [page]
+        return self.carte.select(page)
+
+    def _suivante(self, cellule):
+        if _est_lxml(cellule):
+            suivantes = self._cellule_suivante(cellule)
+            return suivantes[0] if suivantes else None
+        return cellule.find_next_sibling('td')
+
+    def _valeurs_libelles(self, page):
+        valeurs = {}
+        restants = dict(self._libelles)
+        for cellule in self._cellules.select(page):
+            texte = _texte_unique(cellule)
+            if not texte:
+                continue
+            for nom, libelle in list(restants.items()):
+                if libelle in texte:
+                    valeurs[nom] = self.champs[nom].valeur(self._suivante(cellule))
+                    del restants[nom]
+            if not restants:
+                break
+        return valeurs
+
+    def extraire(self, carte, page=None):
+        """
+        :param carte: Élément de la carte (ou de la page) de l'offre
+        :param page: Page complète, pour les champs à libellé (la carte par défaut)
+        :return: dictionnaire nom du champ -> valeur ('' si absente)
+        """
+        offre = {nom: self.champs[nom].valeur(selecteur.select_one(carte) if selecteur is not None else carte)
+                 for nom, selecteur in self._selecteurs.items()}
+        if self._libelles:
+            valeurs = self._valeurs_libelles(page if page is not None else carte)
+            for nom in self._libelles:
+                offre[nom] = valeurs.get(nom, '')
+        return offre
+
+    def extraire_tout(self, page):
+        return [self.extraire(carte, page) for carte in self.cartes(page)]
+
+    def extraire_premiere(self, page):
+        """
+        :return: champs de la première carte de la page, ou None si la page n'en contient pas
+        """
+        if page is None:
+            return None
+        carte = self.carte.select_one(page) if self.carte is not None else page
+        return self.extraire(carte, page) if carte is not None else None
@@ -0,0 +1,191 @@
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+#Référentiel local des villes (coordonnées comprises) et fichier complémentaire modifiable
+FICHIER_VILLES = 'df_ville_region_count.csv'
+FICHIER_LIEUX_SUPPLEMENTAIRES = 'lieux_supplementaires.csv'
+
+#Mots ignorés dans les lieux en texte libre ("Douala, Littoral, Cameroun") en plus des noms de régions
+MOTS_IGNORES = {'cameroun', 'cameroon', 'cmr', 'region', 'ville', 'de', 'du', 'des', 'la', 'le', 'les', 'et'}
+
+# Séparateurs des différentes parties d'un lieu en texte libre
+RE_PARTIES = re.compile(r"[,;/|()\[\]]")
+
+
+# Fonction permettant d'obtenir la clé de comparaison d'un nom (minuscules, sans accents ni tirets)
+def normaliser_nom(texte):
+    texte = unicodedata.normalize('NFKD', str(texte).lower())
+    texte = ''.join(caractere for caractere in texte if not unicodedata.combining(caractere))
+    return re.sub(r"[-_'’\s]+", ' ', texte).strip()
+
+
+# Fonction permettant de découper un nom en trigrammes (avec bordures pour favoriser les débuts de mots)
+def trigrammes(cle):
+    cle = f"  {cle} "
+    return {cle[i:i + 3] for i in range(len(cle) - 2)}
+
+
+# Fonction permettant de lire les référentiels de villes présents
+def lire_referentiel(fichiers=(FICHIER_VILLES, FICHIER_LIEUX_SUPPLEMENTAIRES)):
+    tables = [pd.read_csv(fichier) for fichier in fichiers if os.path.exists(fichier)]
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=['villes'])
+
+
+#Index des villes pour le géocodage hors ligne
+class IndexVilles:
+    """
+    Index construit une seule fois à partir des référentiels locaux : une table clé -> ville
+    pour les correspondances exactes (sans casse ni accents) et un index de trigrammes pour
+    les noms approchants ("Yaounde", "Yaoundé", "yaoude"...). Les lieux en texte libre sont
+    aussi découpés en mots ("Douala, Littoral" -> douala) en ignorant régions et pays.
+    Les résolutions sont mémorisées.
+
+    :param df_villes: DataFrame avec les colonnes villes, regions, latitude, longitude
+                      et éventuellement alias (autres noms séparés par |)
+    :param seuil: Similarité minimale (Jaccard sur les trigrammes) d'une correspondance approchée
+    """
+    def __init__(self, df_villes, seuil=0.5):
+        self.seuil = seuil
+        self.villes = {}
+        self._trigrammes = defaultdict(set)
+        self._nb_trigrammes = {}
+        self._memo = {}
+        self._mots_ignores = set(MOTS_IGNORES)
+
+        for ligne in df_villes.itertuples(index=False):
+            if pd.isna(ligne.villes) or not str(ligne.villes).strip():
+                continue
+            cle = normaliser_nom(ligne.villes)
+            if 'regions' in df_villes.columns and pd.notna(ligne.regions):
+                self._mots_ignores.update(normaliser_nom(ligne.regions).split())
+            entree = self.villes.get(cle, {'ville': str(ligne.villes).strip(), 'region': None,
+                                           'latitude': None, 'longitude': None})
+            # Une ligne sans coordonnées ni région complète l'entrée existante (alias) sans l'effacer
+            for champ, valeur in (('region', getattr(ligne, 'regions', None)),
+                                  ('latitude', getattr(ligne, 'latitude', None)),
+                                  ('longitude', getattr(ligne, 'longitude', None))):
+                if pd.notna(valeur) and str(valeur).strip():
+                    entree[champ] = float(valeur) if champ != 'region' else str(valeur).strip()
+            self._indexer(cle, entree)
+
+            alias = getattr(ligne, 'alias', None)
+            if pd.notna(alias) and str(alias).strip():
+                for nom in str(alias).split('|'):
+                    if nom.strip():
+                        self._indexer(normaliser_nom(nom), entree)
+
+    @classmethod
+    def depuis_fichiers(cls, fichiers=(FICHIER_VILLES, FICHIER_LIEUX_SUPPLEMENTAIRES), seuil=0.5):
+        return cls(lire_referentiel(fichiers), seuil)
+
+    def _indexer(self, cle, entree):
+        self.villes[cle] = entree
+        if cle not in self._nb_trigrammes:
+            morceaux = trigrammes(cle)
+            self._nb_trigrammes[cle] = len(morceaux)
+            for morceau in morceaux:
+                self._trigrammes[morceau].add(cle)
+
+    def _approcher(self, cle):
+        morceaux = trigrammes(cle)
+        communs = Counter()
+        for morceau in morceaux:
+            communs.update(self._trigrammes.get(morceau, ()))
+        meilleure, meilleur_score = None, 0
+        for candidate, nb_communs in communs.items():
+            score = nb_communs / (len(morceaux) + self._nb_trigrammes[candidate] - nb_communs)
+            if score > meilleur_score:
+                meilleure, meilleur_score = candidate, score
+        return meilleure if meilleur_score >= self.seuil else None
+
+    def _par_mots(self, cle):
+        # Groupes de mots consécutifs, des plus longs aux plus courts ("garoua boulai" avant "garoua")
+        for partie in RE_PARTIES.split(cle):
+            mots = partie.split()
+            for taille in range(len(mots), 0, -1):
+                for debut in range(len(mots) - taille + 1):
+                    groupe = mots[debut:debut + taille]
+                    if all(mot in self._mots_ignores for mot in groupe):
+                        continue
+                    if ' '.join(groupe) in self.villes:
+                        return ' '.join(groupe)
+
+        # Sinon, correspondance approchée sur le texte débarrassé des régions et du pays
+        for partie in RE_PARTIES.split(cle):
+            reste = ' '.join(mot for mot in partie.split() if mot not in self._mots_ignores)
+            approchee = self._approcher(reste) if reste else None
+            if approchee:
+                return approchee
+        return None
+
+    def resoudre(self, nom):
+        """
+        :return: dictionnaire (ville, region, latitude, longitude) ou None si le nom est inconnu
+        """
+        if nom is None or (not isinstance(nom, str) and pd.isna(nom)):
+            return None
+        cle = normaliser_nom(nom)
+        if cle not in self._memo:
+            if cle in self.villes:
+                self._memo[cle] = self.villes[cle]
+            else:
+                trouvee = self._par_mots(cle) if cle else None
+                self._memo[cle] = self.villes[trouvee] if trouvee else None
+        return self._memo[cle]
+
+    def geocoder(self, nom):
+        """
+        :return: [latitude, longitude] ou None
+        """
+        entree = self.resoudre(nom)
+        if entree is None or entree['latitude'] is None:
+            return None
+        return [entree['latitude'], entree['longitude']]
+
+    def resoudre_lot(self, noms):
+        """
+        Résout une série de noms en une fois : chaque nom distinct n'est résolu qu'une fois.
+
+        :param noms: Series (ou liste) de noms
+        :return: DataFrame (ville, region, latitude, longitude) aligné sur noms
+        """
+        noms = pd.Series(noms)
+        distincts = noms.dropna().unique()
+        table = pd.DataFrame([self.resoudre(nom) or {} for nom in distincts], index=distincts,
+                             columns=['ville', 'region', 'latitude', 'longitude'])
+        resultat = table.reindex(noms.to_numpy())
+        resultat.index = noms.index
+        resultat[['latitude', 'longitude']] = resultat[['latitude', 'longitude']].astype(float)
+        return resultat
+
+    def est_mention_seule(self, nom):
+        """
+        :return: True si le nom ne contient qu'une région, le pays ou des mots vides ("Littoral", "Cameroun")
+        """
+        if nom is None or (not isinstance(nom, str) and pd.isna(nom)):
+            return False
+        mots = RE_PARTIES.sub(' ', normaliser_nom(nom)).split()
+        return bool(mots) and normaliser_nom(nom) not in self.villes and all(mot in self._mots_ignores for mot in mots)
+
+    def resoudre_longue(self, valeurs):
+        """
+        Résout des lieux en forme longue (une ligne par offre et lieu). Les mentions d'une région
+        ou du pays seules ("Douala, Littoral" -> douala et littoral) sont retirées quand l'offre
+        a un autre lieu.
+
+        :param valeurs: Series des lieux, indexée par offre
+        :return: DataFrame (lieu d'origine, ville, region, latitude, longitude) indexé par offre
+        """
+        distincts = pd.Series(valeurs.dropna().unique())
+        seules = set(distincts[distincts.map(self.est_mention_seule).astype(bool)])
+        mention_seule = valeurs.isin(seules).to_numpy()
+        if mention_seule.any():
+            autres_lieux = pd.Series(~mention_seule, index=valeurs.index).groupby(level=0).transform('sum')
+            valeurs = valeurs[~(mention_seule & (autres_lieux.to_numpy() > 0))]
+        resultat = self.resoudre_lot(valeurs)
+        resultat.insert(0, 'lieu', valeurs.to_numpy())
+        return resultat
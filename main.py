@@ -1,17 +1,35 @@
 import re
 
 import requests
-from bs4 import BeautifulSoup, NavigableString
+from bs4 import NavigableString
 import random
 import csv
 import os
 import time
+import gzip
+import hashlib
+import json
+import signal
+import sqlite3
+import atexit
+import asyncio
+import threading
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from datetime import datetime
-import dateparser
+from urllib.parse import urlparse
+import aiohttp
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+
+from stockage import StockageCSV
+from normalisation_dates import normaliser_date
+from extraction import Champ, Extracteur, analyser_html, contient
 
 #Différents utilisateurs
 user_agents = [
@@ -29,21 +47,796 @@ headers = {
     'Accept-Encoding':'gzip, deflate, br',
     'connection': 'keep-alive'
 }
+#Seau à jetons adaptatif pour un hôte
+class LimiteurHote:
+    """
+    Limite le débit des requêtes vers un hôte avec un seau à jetons.
+    Le débit augmente par petits pas tant que les réponses sont saines et rapides,
+    il est divisé par deux et une pause exponentielle est imposée sur 429, 5xx ou timeout.
+
+    :param debit: Débit initial (requêtes par seconde)
+    :param debit_min: Débit minimum
+    :param debit_max: Débit maximum
+    :param capacite: Nombre de requêtes pouvant partir d'affilée
+    :param pas: Augmentation du débit après une réponse saine
+    :param latence_cible: Au-delà de cette latence (en secondes) le débit n'augmente plus
+    :param pause_base: Première pause (en secondes) après un échec
+    :param pause_max: Pause maximum (en secondes)
+    """
+    def __init__(self, debit=0.5, debit_min=0.05, debit_max=10, capacite=2, pas=0.1,
+                 latence_cible=2.0, pause_base=2, pause_max=120):
+        self.debit = debit
+        self.debit_min = debit_min
+        self.debit_max = debit_max
+        self.capacite = capacite
+        self.pas = pas
+        self.latence_cible = latence_cible
+        self.pause_base = pause_base
+        self.pause_max = pause_max
+        self.jetons = capacite
+        self.dernier = time.monotonic()
+        self.pause_jusqua = 0
+        self.echecs = 0
+        self._verrou = threading.Lock()
+
+    def reserver(self):
+        """
+        Réserve un jeton et retourne le temps d'attente (en secondes) avant d'envoyer la requête.
+        """
+        with self._verrou:
+            maintenant = time.monotonic()
+            self.jetons = min(self.capacite, self.jetons + (maintenant - self.dernier) * self.debit)
+            self.dernier = maintenant
+            self.jetons -= 1
+            attente = -self.jetons / self.debit if self.jetons < 0 else 0
+            return max(attente, self.pause_jusqua - maintenant)
+
+    def signaler(self, statut=None, latence=None, timeout=False, retry_after=None):
+        """
+        Ajuste le débit selon le résultat d'une requête.
+        """
+        with self._verrou:
+            if timeout or statut == 429 or (statut is not None and statut >= 500):
+                self.echecs += 1
+                self.debit = max(self.debit_min, self.debit / 2)
+                pause = min(self.pause_max, self.pause_base * 2 ** (self.echecs - 1))
+                if retry_after:
+                    pause = max(pause, min(retry_after, self.pause_max))
+                self.pause_jusqua = time.monotonic() + pause
+                print(f"Ralentissement : {self.debit:.2f} req/s, pause de {pause:.0f} s")
+            else:
+                self.echecs = 0
+                if latence is not None and latence > 2 * self.latence_cible:
+                    self.debit = max(self.debit_min, self.debit * 0.8)
+                elif latence is None or latence <= self.latence_cible:
+                    self.debit = min(self.debit_max, self.debit + self.pas)
+
+#Planificateur de politesse partagé par tous les scrapers
+class Planificateur:
+    """
+    Associe un LimiteurHote à chaque hôte. Toutes les requêtes (requests, aiohttp,
+    driver.get) passent par attendre() avant d'être envoyées puis par signaler().
+
+    :param reglages: Paramètres transmis à chaque LimiteurHote
+    """
+    def __init__(self, **reglages):
+        self.reglages = reglages
+        self.limiteurs = {}
+        self._verrou = threading.Lock()
+
+    def limiteur(self, url):
+        hote = urlparse(url).netloc
+        with self._verrou:
+            if hote not in self.limiteurs:
+                self.limiteurs[hote] = LimiteurHote(**self.reglages)
+            return self.limiteurs[hote]
+
+    def attendre(self, url):
+        time.sleep(self.limiteur(url).reserver())
+
+    async def attendre_async(self, url):
+        await asyncio.sleep(self.limiteur(url).reserver())
+
+    def signaler(self, url, statut=None, latence=None, timeout=False, retry_after=None):
+        self.limiteur(url).signaler(statut, latence, timeout, _lire_retry_after(retry_after))
+
+    def etat(self):
+        return {hote: round(limiteur.debit, 2) for hote, limiteur in self.limiteurs.items()}
+
+# Fonction permettant de lire l'entête Retry-After (en secondes)
+def _lire_retry_after(valeur):
+    try:
+        return float(valeur) if valeur is not None else None
+    except ValueError:
+        return None
+
+#Cache HTTP sur disque
+class CacheHTTP:
+    """
+    Cache disque des pages HTML. Le corps est compressé (gzip) et les entêtes ETag et
+    Last-Modified sont conservés pour revalider la page par une requête conditionnelle :
+    une réponse 304 réutilise le corps en cache au lieu de le télécharger à nouveau.
+
+    :param dossier: Dossier du cache
+    """
+    def __init__(self, dossier='cache_http'):
+        self.dossier = dossier
+        self.revalidations = 0
+        self.telechargements = 0
+        os.makedirs(dossier, exist_ok=True)
+
+    def _chemin(self, url, extension):
+        cle = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.dossier, cle[:2], f"{cle}.{extension}")
+
+    def entetes_conditionnels(self, url):
+        """
+        Retourne les entêtes If-None-Match / If-Modified-Since pour une url déjà en cache.
+        """
+        if not os.path.exists(self._chemin(url, 'html.gz')):
+            return {}
+        try:
+            with open(self._chemin(url, 'json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        entetes = {}
+        if meta.get('etag'):
+            entetes['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            entetes['If-Modified-Since'] = meta['last_modified']
+        return entetes
+
+    def lire(self, url):
+        try:
+            with gzip.open(self._chemin(url, 'html.gz'), 'rt', encoding='utf-8') as f:
+                html = f.read()
+        except OSError:
+            return None
+        self.revalidations += 1
+        return html
+
+    def ecrire(self, url, html, entetes):
+        """
+        Enregistre une page si le serveur a fourni un ETag ou un Last-Modified.
+        """
+        self.telechargements += 1
+        etag = entetes.get('ETag')
+        last_modified = entetes.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        chemin = self._chemin(url, 'html.gz')
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        # Écriture dans un fichier temporaire puis remplacement pour ne jamais laisser de page tronquée
+        with gzip.open(chemin + '.tmp', 'wt', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(chemin + '.tmp', chemin)
+        meta = {'url': url, 'etag': etag, 'last_modified': last_modified,
+                'date': datetime.now().isoformat(timespec='seconds')}
+        with open(self._chemin(url, 'json') + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(self._chemin(url, 'json') + '.tmp', self._chemin(url, 'json'))
+
+#Points de reprise des crawls
+class PointsReprise:
+    """
+    Sauvegarde durable de l'avancement des crawls pour reprendre après un arrêt.
+    Les curseurs de pagination (par url de liste) et les positions FNE sont dans un
+    fichier JSON réécrit de façon atomique. Les liens déjà traités (par origine) sont
+    ajoutés ligne par ligne dans un journal, ce qui évite de réécrire tout l'historique.
+
+    :param fichier: Fichier JSON des curseurs
+    :param fichier_liens: Journal des liens traités
+    """
+    def __init__(self, fichier='reprise.json', fichier_liens='reprise_liens.txt'):
+        self.fichier = fichier
+        self.fichier_liens = fichier_liens
+        self._verrou = threading.Lock()
+
+        try:
+            with open(fichier, encoding='utf-8') as f:
+                etat = json.load(f)
+        except (FileNotFoundError, ValueError):
+            etat = {}
+        self.curseurs = etat.get('curseurs', {})
+        self.fne = etat.get('fne', {})
+
+        self.termines = {}
+        if os.path.exists(fichier_liens):
+            with open(fichier_liens, encoding='utf-8') as f:
+                for ligne in f:
+                    origine, _, lien = ligne.rstrip('\n').partition('\t')
+                    self.termines.setdefault(origine, set()).add(lien)
+        self._journal = open(fichier_liens, 'a', encoding='utf-8')
+
+    def _sauvegarder(self):
+        with open(self.fichier + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'curseurs': self.curseurs, 'fne': self.fne}, f, indent=2)
+        os.replace(self.fichier + '.tmp', self.fichier)
+
+    def curseur(self, url, defaut):
+        return self.curseurs.get(url, defaut)
+
+    def avancer(self, url, page):
+        with self._verrou:
+            self.curseurs[url] = page
+            self._sauvegarder()
+
+    def position_fne(self, url, defaut):
+        position = self.fne.get(url)
+        return (position['type_lien'], position['reference']) if position else defaut
+
+    def avancer_fne(self, url, type_lien, reference):
+        with self._verrou:
+            self.fne[url] = {'type_lien': type_lien, 'reference': reference}
+            self._sauvegarder()
+
+    def effacer(self, url):
+        """
+        Oublie le curseur d'une url de liste terminée pour que le prochain crawl reparte du début.
+        Les offres déjà traitées sont gardées : les autres urls du même site en ont encore besoin.
+        """
+        with self._verrou:
+            self.curseurs.pop(url, None)
+            self.fne.pop(url, None)
+            self._sauvegarder()
+
+    def oublier_offres(self, origine):
+        """
+        Oublie les offres déjà traitées d'une origine (le journal des liens est réécrit sans elles),
+        une fois toutes les urls du site parcourues : un --resume ultérieur ne doit sauter que les
+        offres du crawl interrompu.
+        """
+        with self._verrou:
+            if self.termines.pop(origine, None) is not None:
+                self._reecrire_journal()
+
+    def _reecrire_journal(self):
+        self._journal.close()
+        with open(self.fichier_liens + '.tmp', 'w', encoding='utf-8') as f:
+            for origine, liens in self.termines.items():
+                f.writelines(f"{origine}\t{lien}\n" for lien in liens)
+        os.replace(self.fichier_liens + '.tmp', self.fichier_liens)
+        self._journal = open(self.fichier_liens, 'a', encoding='utf-8')
+
+    def est_termine(self, origine, lien):
+        return lien in self.termines.get(origine, ())
+
+    def marquer_termine(self, origine, lien):
+        with self._verrou:
+            self.termines.setdefault(origine, set()).add(lien)
+            self._journal.write(f"{origine}\t{lien}\n")
+            self._journal.flush()
+
+    def fermer(self):
+        self._journal.close()
+
+#Index des offres déjà enregistrées (mode incrémental)
+class IndexOffresConnues:
+    """
+    Index des liens déjà présents dans le stockage des offres, par origine.
+    Les sites listent les offres de la plus récente à la plus ancienne : une longue
+    série d'offres connues signifie que la suite de la pagination est déjà enregistrée.
+
+    :param stockage: Stockage des offres (StockageCSV, StockageParquet ou StockageSQLite)
+    :param seuil: Nombre d'offres connues consécutives qui arrête la pagination d'un site
+    """
+    def __init__(self, stockage, seuil=20):
+        self.seuil = seuil
+        self.liens = stockage.liens_connus()
+        self.consecutives = {}
+        self._verrou = threading.Lock()
+        print(f"Index incrémental : {sum(len(liens) for liens in self.liens.values())} offres connues")
+
+    def verifier(self, origine, lien):
+        """
+        Retourne True si l'offre est connue et met à jour la série d'offres connues de l'origine.
+        """
+        with self._verrou:
+            connue = lien in self.liens.get(origine, ())
+            self.consecutives[origine] = self.consecutives.get(origine, 0) + 1 if connue else 0
+            return connue
+
+    def ajouter(self, origine, lien):
+        with self._verrou:
+            self.liens.setdefault(origine, set()).add(lien)
+
+    def reinitialiser(self, origine):
+        with self._verrou:
+            self.consecutives[origine] = 0
+
+    def arret_atteint(self, origine):
+        return self.consecutives.get(origine, 0) >= self.seuil
+
+#Empreintes des cartes d'offres (détails déjà lus)
+class EmpreintesCartes:
+    """
+    Retient pour chaque lien l'empreinte des champs de sa carte dans la liste des offres et les
+    champs lus sur sa page de détail. Tant que la carte n'a pas changé et que les détails ont
+    moins de ttl_jours, la page de détail n'est pas retéléchargée : les détails retenus servent.
+
+    :param fichier: Base SQLite des empreintes
+    :param ttl_jours: Durée (en jours) au-delà de laquelle la page de détail est relue
+    """
+    def __init__(self, fichier='empreintes_cartes.db', ttl_jours=7):
+        self.fichier = fichier
+        self.ttl = ttl_jours * 24 * 3600
+        self.reutilisees = 0
+        self.telechargees = 0
+        self._verrou = threading.Lock()
+        self._connexion = sqlite3.connect(fichier, check_same_thread=False)
+        self._connexion.execute('PRAGMA journal_mode=WAL')
+        self._connexion.execute(
+            'CREATE TABLE IF NOT EXISTS empreintes (origine TEXT NOT NULL, lien TEXT NOT NULL, '
+            'empreinte TEXT NOT NULL, details TEXT NOT NULL, date REAL NOT NULL, PRIMARY KEY (origine, lien))'
+        )
+
+    @staticmethod
+    def empreinte(carte):
+        texte = json.dumps(carte, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(texte.encode('utf-8')).hexdigest()
+
+    def details(self, origine, carte):
+        """
+        :return: détails retenus pour la carte, ou None si la page de détail doit être téléchargée
+        """
+        with self._verrou:
+            ligne = self._connexion.execute('SELECT empreinte, details, date FROM empreintes WHERE origine = ? AND lien = ?',
+                                            (origine, carte['lien'])).fetchone()
+            if ligne is None or ligne[0] != self.empreinte(carte) or time.time() - ligne[2] > self.ttl:
+                self.telechargees += 1
+                return None
+            self.reutilisees += 1
+            return json.loads(ligne[1])
+
+    def enregistrer(self, origine, carte, details):
+        with self._verrou, self._connexion:
+            self._connexion.execute('INSERT OR REPLACE INTO empreintes VALUES (?, ?, ?, ?, ?)',
+                                    (origine, carte['lien'], self.empreinte(carte),
+                                     json.dumps(details, ensure_ascii=False, default=str), time.time()))
+
+    def rapport(self):
+        total = self.reutilisees + self.telechargees
+        taux = self.reutilisees / total * 100 if total else 0
+        print(f"Empreintes : {self.reutilisees} pages de détail évitées, {self.telechargees} téléchargées "
+              f"({taux:.0f}% évitées)")
+
+    def fermer(self):
+        with self._verrou:
+            self._connexion.close()
+
+#Écriture groupée des offres
+class EcrivainOffres:
+    """
+    Regroupe les offres par lots avant de les confier au stockage, depuis plusieurs scrapers à la fois.
+    Un lot part quand il atteint taille_lot offres ou toutes les intervalle secondes. Le dernier
+    lot est écrit à la fermeture du programme ou à la réception de SIGINT/SIGTERM.
+
+    :param stockage: Stockage des lots (StockageCSV par défaut, ou StockageParquet)
+    :param taille_lot: Nombre d'offres par lot
+    :param intervalle: Délai maximum (en secondes) avant l'écriture d'un lot incomplet
+    :param apres_ecriture: Fonction appelée avec chaque lot une fois celui-ci sur disque
+    """
+    def __init__(self, stockage=None, taille_lot=50, intervalle=10, apres_ecriture=None):
+        self.stockage = stockage if stockage is not None else StockageCSV()
+        self.taille_lot = taille_lot
+        self.intervalle = intervalle
+        self.apres_ecriture = apres_ecriture
+        self._tampon = []
+        self._ouvert = True
+        # Verrou réentrant : le gestionnaire de signal peut interrompre un ajouter() en cours
+        self._verrou = threading.RLock()
+
+        self._arret = threading.Event()
+        threading.Thread(target=self._vider_periodiquement, daemon=True).start()
+        atexit.register(self.fermer)
+        self._installer_signaux()
+
+    def _installer_signaux(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for numero in (signal.SIGINT, signal.SIGTERM):
+            precedent = signal.getsignal(numero)
+
+            def gestionnaire(numero_recu, frame, precedent=precedent):
+                self.vider()
+                if callable(precedent):
+                    precedent(numero_recu, frame)
+                else:
+                    raise SystemExit(128 + numero_recu)
+            signal.signal(numero, gestionnaire)
+
+    def _vider_periodiquement(self):
+        while not self._arret.wait(self.intervalle):
+            self.vider()
+
+    def ajouter(self, offre):
+        with self._verrou:
+            self._tampon.append(offre)
+            if len(self._tampon) >= self.taille_lot:
+                self.vider()
+
+    def vider(self):
+        with self._verrou:
+            if not self._tampon or not self._ouvert:
+                return
+            lot, self._tampon = self._tampon, []
+            self.stockage.ecrire_lot(lot)
+            print(f"{len(lot)} offres enregistrées avec succès !")
+            if self.apres_ecriture is not None:
+                self.apres_ecriture(lot)
+
+    def fermer(self):
+        self._arret.set()
+        with self._verrou:
+            self.vider()
+            if self._ouvert:
+                self.stockage.fermer()
+                self._ouvert = False
+
+#Progression des crawls par site
+class Progression:
+    """
+    Compte les pages récupérées et les offres ajoutées par site, depuis plusieurs crawls à la fois,
+    et affiche toutes les intervalle secondes les débits de chaque site (pages/s, offres/s).
+
+    :param intervalle: Délai (en secondes) entre deux affichages
+    """
+    def __init__(self, intervalle=10):
+        self.intervalle = intervalle
+        self.debut = time.monotonic()
+        self.compteurs = {}
+        self._precedents = {}
+        self._dernier_affichage = self.debut
+        self._verrou = threading.Lock()
+        self._arret = threading.Event()
+
+    def compter(self, site, pages=0, offres=0):
+        with self._verrou:
+            compteurs = self.compteurs.setdefault(site, {'pages': 0, 'offres': 0})
+            compteurs['pages'] += pages
+            compteurs['offres'] += offres
+
+    def resume(self, depuis_debut=False):
+        """
+        :param depuis_debut: Débits moyens depuis le début (sinon depuis le dernier résumé)
+        :return: une ligne par site
+        """
+        with self._verrou:
+            maintenant = time.monotonic()
+            duree = max(maintenant - (self.debut if depuis_debut else self._dernier_affichage), 1e-6)
+            lignes = []
+            for site, compteurs in sorted(self.compteurs.items()):
+                precedents = {'pages': 0, 'offres': 0} if depuis_debut else self._precedents.get(site, {'pages': 0, 'offres': 0})
+                lignes.append(f"{site} : {compteurs['pages']} pages ({(compteurs['pages'] - precedents['pages']) / duree:.1f} pages/s), "
+                              f"{compteurs['offres']} offres ({(compteurs['offres'] - precedents['offres']) / duree:.1f} offres/s)")
+                self._precedents[site] = dict(compteurs)
+            self._dernier_affichage = maintenant
+            return lignes
+
+    def afficher(self, depuis_debut=False):
+        lignes = self.resume(depuis_debut)
+        if lignes:
+            print(f"--- Progression après {time.monotonic() - self.debut:.0f} s ---")
+            for ligne in lignes:
+                print(ligne)
+
+    def _afficher_periodiquement(self):
+        while not self._arret.wait(self.intervalle):
+            self.afficher()
+
+    def demarrer(self):
+        threading.Thread(target=self._afficher_periodiquement, daemon=True).start()
+        return self
+
+    def arreter(self):
+        """
+        Arrête l'affichage périodique et affiche le bilan (débits moyens depuis le début).
+        """
+        self._arret.set()
+        self.afficher(depuis_debut=True)
+
 #variables globales
+planificateur = Planificateur()
+moteur = None
+session = None
+cache_http = None
+points_reprise = None
+index_connues = None
+ecrivain = None
+verrou_ecrivain = threading.Lock()
+progression = None
+empreintes_cartes = None
+
+# Fonction permettant de créer la session partagée (pool de connexions keep-alive)
+def configurer_session(taille_pool=10):
+    global session
+    session = requests.Session()
+    session.headers.update(headers)
+    adaptateur = HTTPAdapter(pool_connections=taille_pool, pool_maxsize=taille_pool)
+    session.mount('http://', adaptateur)
+    session.mount('https://', adaptateur)
+    return session
+
+def obtenir_session():
+    return session if session is not None else configurer_session()
+
+# Fonction permettant d'activer la reprise des crawls (option --resume)
+def activer_reprise(fichier='reprise.json', fichier_liens='reprise_liens.txt'):
+    global points_reprise
+    points_reprise = PointsReprise(fichier, fichier_liens)
+    return points_reprise
+
+# Fonction permettant de savoir si une offre a déjà été traitée avant l'arrêt du crawl
+def offre_deja_traitee(origine, lien):
+    return points_reprise is not None and points_reprise.est_termine(origine, lien)
+
+# Fonction permettant d'oublier le curseur d'une url de liste terminée
+def terminer_reprise(url):
+    if points_reprise is not None:
+        obtenir_ecrivain().vider()
+        points_reprise.effacer(url)
+
+# Fonction permettant d'oublier les offres traitées d'un site dont toutes les urls sont terminées
+def terminer_reprise_origine(origine):
+    if points_reprise is not None:
+        # Les offres encore en attente seraient sinon marquées traitées après l'effacement
+        obtenir_ecrivain().vider()
+        points_reprise.oublier_offres(origine)
+
+# Fonction permettant de marquer les offres comme traitées une fois qu'elles sont sur disque
+def _marquer_offres_ecrites(offres):
+    if points_reprise is not None:
+        for offre in offres:
+            points_reprise.marquer_termine(offre['origine'], offre['lien'])
+
+# Fonction permettant de configurer l'écriture groupée des offres (StockageCSV ou StockageParquet)
+def configurer_ecrivain(stockage=None, taille_lot=50, intervalle=10):
+    global ecrivain
+    with verrou_ecrivain:
+        if ecrivain is not None:
+            ecrivain.fermer()
+        ecrivain = EcrivainOffres(stockage, taille_lot, intervalle, apres_ecriture=_marquer_offres_ecrites)
+        return ecrivain
+
+def obtenir_ecrivain():
+    global ecrivain
+    with verrou_ecrivain:
+        if ecrivain is None:
+            ecrivain = EcrivainOffres(apres_ecriture=_marquer_offres_ecrites)
+        return ecrivain
+
+# Fonction permettant d'afficher la progression des crawls (pages/s et offres/s par site)
+def activer_progression(intervalle=10):
+    global progression
+    if progression is None:
+        progression = Progression(intervalle).demarrer()
+    return progression
+
+def compter_progression(site, pages=0, offres=0):
+    if progression is not None:
+        progression.compter(site, pages, offres)
+
+# Fonction permettant de ne relire les pages de détail que si la carte de l'offre a changé (option --empreintes)
+def activer_empreintes(fichier='empreintes_cartes.db', ttl_jours=7):
+    global empreintes_cartes
+    empreintes_cartes = EmpreintesCartes(fichier, ttl_jours)
+    return empreintes_cartes
+
+# Fonction permettant de retrouver les détails d'une carte inchangée (None : page de détail à télécharger)
+def details_memorises(origine, carte):
+    return empreintes_cartes.details(origine, carte) if empreintes_cartes is not None else None
+
+def memoriser_details(origine, carte, details):
+    if empreintes_cartes is not None:
+        empreintes_cartes.enregistrer(origine, carte, details)
+
+# Fonction permettant d'activer le mode incrémental
+def activer_mode_incremental(seuil=20, stockage=None):
+    """
+    :param stockage: Stockage dont les offres sont connues (celui de l'écrivain par défaut :
+                     configurer l'écrivain avant d'activer le mode incrémental)
+    """
+    global index_connues
+    index_connues = IndexOffresConnues(stockage if stockage is not None else obtenir_ecrivain().stockage, seuil)
+    return index_connues
+
+# Fonction permettant de savoir si une offre peut être ignorée (déjà enregistrée ou déjà traitée)
+def offre_a_ignorer(origine, lien):
+    connue = index_connues is not None and index_connues.verifier(origine, lien)
+    return connue or offre_deja_traitee(origine, lien)
+
+# Fonction permettant d'activer le cache HTTP sur disque
+def activer_cache_http(dossier='cache_http'):
+    global cache_http
+    cache_http = CacheHTTP(dossier)
+    return cache_http
+
+#Moteur de récupération asynchrone
+class MoteurAsync:
+    """
+    Récupère les pages avec une boucle asyncio qui tourne dans un thread dédié.
+    La session aiohttp est partagée (pool de connexions keep-alive) et un sémaphore
+    par hôte borne le nombre de requêtes simultanées sur un même site.
+
+    :param max_par_hote: Nombre maximum de requêtes simultanées par hôte
+    :param max_connexions: Nombre maximum de connexions ouvertes au total
+    :param limites_hotes: Limites spécifiques par hôte (ex: {'www.emploi.cm': 8})
+    :param timeout: Délai maximum (en secondes) d'une requête
+    :param nbre_essai: Nombre de tentatives par url
+    """
+    def __init__(self, max_par_hote=4, max_connexions=20, limites_hotes=None, timeout=30, nbre_essai=3):
+        self.max_par_hote = max_par_hote
+        self.max_connexions = max_connexions
+        self.limites_hotes = limites_hotes or {}
+        self.timeout = timeout
+        self.nbre_essai = nbre_essai
+        self._semaphores = {}
+        self._boucle = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._boucle.run_forever, daemon=True)
+        self._thread.start()
+        self._session = self._executer(self._ouvrir_session())
+
+    async def _ouvrir_session(self):
+        connecteur = aiohttp.TCPConnector(limit=self.max_connexions, keepalive_timeout=60)
+        return aiohttp.ClientSession(connector=connecteur, headers=headers,
+                                     timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    def _semaphore(self, hote):
+        if hote not in self._semaphores:
+            self._semaphores[hote] = asyncio.Semaphore(self.limites_hotes.get(hote, self.max_par_hote))
+        return self._semaphores[hote]
+
+    def _executer(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._boucle).result()
+
+    async def recuperer(self, url):
+        """
+        Retourne le HTML d'une url, ou None si tous les essais ont échoué.
+        """
+        async with self._semaphore(urlparse(url).netloc):
+            conditionnel = True
+            for essai in range(self.nbre_essai):
+                await planificateur.attendre_async(url)
+                debut = time.monotonic()
+                entetes = cache_http.entetes_conditionnels(url) if cache_http is not None and conditionnel else {}
+                try:
+                    async with self._session.get(url, headers=entetes) as response:
+                        print(f'url contacter: {url} !')
+                        planificateur.signaler(url, response.status, time.monotonic() - debut,
+                                               retry_after=response.headers.get('Retry-After'))
+                        if response.status == 304:
+                            html = await asyncio.to_thread(cache_http.lire, url) if cache_http is not None else None
+                            if html is not None:
+                                return html
+                            # Copie absente du cache : nouvelle requête sans entêtes conditionnels
+                            conditionnel = False
+                            continue
+                        response.raise_for_status()
+                        html = await response.text()
+                        if cache_http is not None:
+                            await asyncio.to_thread(cache_http.ecrire, url, html, response.headers)
+                        return html
+                except asyncio.TimeoutError as e:
+                    planificateur.signaler(url, timeout=True)
+                    print(f"Délai dépassé : {e} avec l'url : {url}")
+                    print(f"essai numéro {essai}")
+                except aiohttp.ClientError as e:
+                    # Comme scrape() : connexion coupée ou refusée, erreur DNS... ralentissent l'hôte
+                    # (le statut d'une réponse en erreur a déjà été signalé)
+                    if not isinstance(e, aiohttp.ClientResponseError):
+                        planificateur.signaler(url, timeout=True)
+                    print(f"Erreur lors de la requête : {e} avec l'url : {url}")
+                    print(f"essai numéro {essai}")
+                except Exception as e:
+                    # Comme scrape() : une erreur sur une url ne doit pas interrompre tout le lot (gather)
+                    planificateur.signaler(url, timeout=True)
+                    print(f"Erreur inattendue : {e} avec l'url : {url}")
+                    print(f"essai numéro {essai}")
+                if essai == self.nbre_essai - 1:
+                    print("Échec après tous les essais")
+                    return None
+
+    async def sonder(self, url):
+        """
+        Requête HEAD : retourne la taille annoncée du corps (Content-Length), ou None si le
+        serveur ne l'annonce pas ou si la requête échoue.
+        """
+        async with self._semaphore(urlparse(url).netloc):
+            await planificateur.attendre_async(url)
+            debut = time.monotonic()
+            try:
+                async with self._session.head(url, allow_redirects=True) as response:
+                    planificateur.signaler(url, response.status, time.monotonic() - debut,
+                                           retry_after=response.headers.get('Retry-After'))
+                    return response.content_length if response.status == 200 else None
+            except Exception as e:
+                # Délai dépassé, connexion refusée... : l'hôte est ralenti comme pour un GET
+                planificateur.signaler(url, timeout=True)
+                if not isinstance(e, asyncio.TimeoutError):
+                    print(f"Erreur lors de la requête HEAD : {e} avec l'url : {url}")
+            return None
+
+    def sonder_plusieurs(self, urls):
+        async def tout_sonder():
+            return await asyncio.gather(*(self.sonder(url) for url in urls))
+
+        return self._executer(tout_sonder())
+
+    def scrape(self, url, analyseur=None):
+        # Le parsing est fait dans le thread appelant pour ne pas bloquer la boucle
+        html = self._executer(self.recuperer(url))
+        return analyser_html(html, analyseur) if html is not None else None
+
+    def scrape_plusieurs(self, urls, analyseur=None):
+        async def tout_recuperer():
+            return await asyncio.gather(*(self.recuperer(url) for url in urls))
+
+        pages = self._executer(tout_recuperer())
+        return [analyser_html(html, analyseur) if html is not None else None for html in pages]
+
+    def fermer(self):
+        self._executer(self._session.close())
+        self._boucle.call_soon_threadsafe(self._boucle.stop)
+        self._thread.join()
+
+# Fonction permettant de faire passer scrape() par le moteur asynchrone
+def activer_moteur_async(max_par_hote=4, max_connexions=20, limites_hotes=None):
+    global moteur
+    if moteur is None:
+        moteur = MoteurAsync(max_par_hote, max_connexions, limites_hotes)
+    return moteur
+
+def desactiver_moteur_async():
+    global moteur
+    if moteur is not None:
+        moteur.fermer()
+        moteur = None
+
 #Fonction permettant d'extraire les données
-def scrape(url):
+def scrape(url, analyseur=None):
+    """
+    :param analyseur: Analyseur HTML (arbre lxml par défaut, voir extraction.ANALYSEUR_DEFAUT)
+    """
+    if moteur is not None:
+        return moteur.scrape(url, analyseur)
+
     nbre_essai = 3
+    conditionnel = True
     for essai in range (nbre_essai):
         try:
             #print(f'url à contacter: {url} ...')
-            response = requests.get(url, headers=headers, timeout=30)
+            planificateur.attendre(url)
+            debut = time.monotonic()
+            entetes = cache_http.entetes_conditionnels(url) if cache_http is not None and conditionnel else {}
+            response = obtenir_session().get(url, headers=entetes, timeout=30)
             print(f'url contacter: {url} !')
+            planificateur.signaler(url, response.status_code, time.monotonic() - debut,
+                                   retry_after=response.headers.get('Retry-After'))
+            if response.status_code == 304:
+                # Page inchangée : on réutilise la copie du cache
+                html = cache_http.lire(url) if cache_http is not None else None
+                if html is not None:
+                    print(f"Page inchangée (cache) : {url}")
+                    return analyser_html(html, analyseur)
+                # Copie absente du cache : nouvelle requête sans entêtes conditionnels
+                conditionnel = False
+                continue
             response.raise_for_status() # Lève une exception si le statut HTTP n'est pas 200
             print(f"Succès à l'essai {essai}")
+            if cache_http is not None:
+                cache_http.ecrire(url, response.text, response.headers)
             # Récupération du contenu HTML
-            soup = BeautifulSoup(response.text, 'html5lib')
+            soup = analyser_html(response.text, analyseur)
             return soup
 
+        except (requests.Timeout, requests.ConnectionError) as e:
+            planificateur.signaler(url, timeout=True)
+            print(f"Erreur lors de la requête : {e} avec l'url : {url}")
+            print(f"essai numéro {essai}")
+            if essai == nbre_essai-1:  # Si c'est le dernier essai
+                print("Échec après tous les essais")
+                return None
         except requests.RequestException as e:
             print(f"Erreur lors de la requête : {e} avec l'url : {url}")
             print(f"essai numéro {essai}")
@@ -56,7 +849,34 @@ def scrape(url):
             if essai == nbre_essai-1:  # Si c'est le dernier essai
                 print("Échec après tous les essais")
                 return None
-        time.sleep(2)
+
+# Fonction permettant de récupérer plusieurs pages en parallèle (dans l'ordre des urls)
+def scrape_plusieurs(urls, analyseur=None):
+    if moteur is not None:
+        return moteur.scrape_plusieurs(urls, analyseur)
+    return [scrape(url, analyseur) for url in urls]
+
+# Fonction permettant d'obtenir la taille des pages sans les télécharger (requêtes HEAD, dans l'ordre des urls)
+def sonder_plusieurs(urls):
+    if moteur is not None:
+        return moteur.sonder_plusieurs(urls)
+    tailles = []
+    for url in urls:
+        planificateur.attendre(url)
+        debut = time.monotonic()
+        try:
+            response = obtenir_session().head(url, allow_redirects=True, timeout=30)
+            planificateur.signaler(url, response.status_code, time.monotonic() - debut,
+                                   retry_after=response.headers.get('Retry-After'))
+            longueur = response.headers.get('Content-Length')
+            tailles.append(int(longueur) if response.status_code == 200 and longueur and longueur.isdigit() else None)
+        except requests.Timeout:
+            planificateur.signaler(url, timeout=True)
+            tailles.append(None)
+        except requests.RequestException as e:
+            print(f"Erreur lors de la requête HEAD : {e} avec l'url : {url}")
+            tailles.append(None)
+    return tailles
 
 # Fonction pour tester si un element est vide
 def test_if_empty (element):
@@ -73,27 +893,17 @@ def convertir_en_date(relative_date_str):
     """
     Convertit une expression relative comme "il y a 3 jours" ou "6 months ago" en une date exacte.
     Retourne un objet datetime.date correspondant.
+    Les formats courants sont reconnus sans dateparser et mis en cache (voir normalisation_dates).
     """
-    if not relative_date_str:
-        return None
-
-    # On utilise dateparser pour analyser les formats relatifs automatiquement
-    date = dateparser.parse(relative_date_str, settings={
-        'RELATIVE_BASE': datetime.now(),
-        'PREFER_DATES_FROM': 'past',
-        'TIMEZONE': 'UTC',
-        'RETURN_AS_TIMEZONE_AWARE': False
-    })
-
-    if date:
-        return date.date()
-    else:
-        return None
+    return normaliser_date(relative_date_str)
 
 
 
 #Fonction permettant d'ajouter des offres
 def ajouter_offres(offres,lien,titre='',compagnie='',description='',niveau_etude='',experience='',type_contrat='',lieu='',date_publication='',date_expiration='',origine=''):
+    if offre_a_ignorer(origine, lien):
+        print(f"Offre déjà connue : {lien}")
+        return
     print("Ajouter offres ...")
     nouvelle_offres ={
         'lien': lien,
@@ -110,69 +920,67 @@ def ajouter_offres(offres,lien,titre='',compagnie='',description='',niveau_etude
     }
     offres.append(nouvelle_offres)
 
-    save_to_file([nouvelle_offres], 'offres_emploi.csv', 'a')
+    obtenir_ecrivain().ajouter(nouvelle_offres)
+    compter_progression(origine, offres=1)
+    if index_connues is not None:
+        index_connues.ajouter(origine, lien)
 
     print("Nouvelles offres ajoutées !")
 
 
 
+#Champs d'une carte d'offre EmploiCM
+EXTRACTEUR_EMPLOICM = Extracteur(carte='.card-job', champs={
+    'lien': Champ(attribut='data-href'),
+    'titre': Champ('.card-job-detail h3'),
+    'compagnie': Champ('.card-job-detail a.card-job-company'),
+    'description': Champ('.card-job-detail .card-job-description p'),
+    'niveau_etude': Champ('.card-job-detail ul li:nth-child(1) strong'),
+    'experience': Champ('.card-job-detail ul li:nth-child(2) strong'),
+    'type_contrat': Champ('.card-job-detail ul li:nth-child(3) strong'),
+    'lieu': Champ('.card-job-detail ul li:nth-child(4) strong'),
+    'date_publication': Champ('.card-job-detail time'),
+})
+
 def scraper_offres_emploicm(url) :
     soup = scrape(url)
     #test_if_empty(soup)
     #save_to_file(soup, "emploicm.html", 'w', 'html')
-    #Récupération des cartes
-    cards = soup.select('.card-job')
-    
+
     #Liste des offres
     offres = []
-    
-    #Récupération des données
-    for card in cards :
-        lien = card.get('data-href', '') if card.get('data-href' , '') else ''
-        titre = card.select_one('.card-job-detail h3').text.strip() if card.select_one('.card-job-detail h3') else ''
-        compagnie = card.select_one('.card-job-detail a.card-job-company').text.strip() if card.select_one('.card-job-detail a') else ''
-        description = card.select_one('.card-job-detail .card-job-description p').text.strip() if card.select_one('.card-job-detail .card-job-description p') else ''
-        niveau_etude = card. select_one('.card-job-detail ul li:nth-child(1) strong').text.strip() if card.select_one('.card-job-detail ul li:nth-child(1) strong') else ''
-        experience = card. select_one('.card-job-detail ul li:nth-child(2) strong').text.strip() if card.select_one('.card-job-detail ul li:nth-child(2) strong') else ''
-        type_contrat = card. select_one('.card-job-detail ul li:nth-child(3) strong').text.strip() if card.select_one('.card-job-detail ul li:nth-child(3) strong') else ''
-        lieu = card. select_one('.card-job-detail ul li:nth-child(4) strong').text.strip() if card.select_one('.card-job-detail ul li:nth-child(4) strong') else ''
-        date_publication = card. select_one('.card-job-detail time').text.strip() if card.select_one('.card-job-detail time') else ''
-        date_expiration = ''
-        origine = 'emploicm'
-        
-        #Ajout des données à la liste
-        ajouter_offres(offres, lien, titre, compagnie, description, niveau_etude, experience, type_contrat, lieu,
-                       date_publication, date_expiration, origine)
+
+    #Récupération des données de chaque carte et ajout à la liste
+    for champs in EXTRACTEUR_EMPLOICM.extraire_tout(soup):
+        ajouter_offres(offres, origine='emploicm', **champs)
     return offres
-def scrape_all_pages_emploicm(url) :
-    scrape_all_pages(url, scraper_offres_emploicm, "query")
+def scrape_all_pages_emploicm(url, concurrence=1) :
+    scrape_all_pages(url, scraper_offres_emploicm, "query", concurrence=concurrence, origine='emploicm')
+    terminer_reprise_origine('emploicm')
 
 
+#Champs d'un article Cameroon Desk
+EXTRACTEUR_CAMEROONDESK = Extracteur(carte='.post-filter', champs={
+    'titre': Champ('.entry-title a'),
+    'date_publication': Champ('i.bi-calendar2-minus'),
+    'lien': Champ('a.post-filter-inner', attribut='href'),
+    'description': Champ('div.post-snippet'),
+})
+
 def scraper_offres_cameroondesk(url):
     soup = scrape(url)
     test_if_empty(soup)
     save_to_file(soup, "cameroondesk.html", 'w', 'html')
-    posts = soup.select('.post-filter')
     offres = []
-    for post in posts:
-        titre = post.select_one('.entry-title a').text.strip() if post.select_one('.entry-title a') else ''
-        date_publication = post.select_one('i.bi-calendar2-minus').text.strip() if post.select_one('i.bi-calendar2-minus') else ''
-        lien = post.select_one('a.post-filter-inner').get('href') if post.select_one('a.post-filter-inner') else ''
-        description = post.select_one('div.post-snippet').text.strip() if post.select_one('div.post-snippet') else ''
-        niveau_etude = ''
-        experience = ''
-        type_contrat = ''
-        lieu = ''
-        compagnie = ''
-        origine = 'Cameroon Desk'
-
-        ajouter_offres(offres,lien,titre,compagnie,description,niveau_etude,experience,type_contrat,lieu,date_publication,origine)
+    for champs in EXTRACTEUR_CAMEROONDESK.extraire_tout(soup):
+        ajouter_offres(offres, origine='Cameroon Desk', **champs)
 
     return offres
 
 
 def scraper_offres_jobinfocamer(url):
-    soup = scrape(url)
+    # Les sélecteurs supposent le tbody ajouté par html5lib
+    soup = scrape(url, analyseur='html5lib')
     test_if_empty(soup)
     save_to_file(soup, "jobinfocamer.html", 'w', 'html')
     rows = soup.select('tbody tr')
@@ -213,6 +1021,24 @@ def scraper_offres_jobinfocamer(url):
         })
 
 
+#Champs d'une offre FNE : tableau de l'offre et cellules repérées par leur libellé
+def champs_fne(rang_expiration):
+    return {
+        'titre': Champ('tr:nth-child(2) td:nth-child(2) b.text-success'),
+        'description': Champ(libelle="Missions / Tâches"),
+        'niveau_etude': Champ(libelle="Formation initiale"),
+        'experience': Champ(libelle="Durée de l'expérience professionnelle"),
+        'type_contrat': Champ('tr:nth-child(6) td:nth-child(2)'),
+        'lieu': Champ(f'tr:nth-child({rang_expiration - 1}) td:nth-child(2)'),
+        'date_expiration': Champ(f'tr:nth-child({rang_expiration}) td:nth-child(2)'),
+    }
+
+# Le tableau des offres de type 1 a une ligne de plus avant le lieu et la date d'expiration
+EXTRACTEURS_FNE = {
+    1: Extracteur(champs_fne(9), carte='table div.telecharger_tableau table.table'),
+    2: Extracteur(champs_fne(8), carte='table div.telecharger_tableau table.table'),
+}
+
 def scrape_all_offres_fne(url):
     complete_url = ''
     offres = []
@@ -221,6 +1047,9 @@ def scrape_all_offres_fne(url):
     count_type_lien1 = 0
     count_type_lien2 = 0
     type_lien = 2
+    if points_reprise is not None:
+        type_lien, reference = points_reprise.position_fne(url, (type_lien, reference))
+        print(f"Reprise à l'url de type {type_lien}, référence {reference}")
 
     while True:
         if type_lien == 1:
@@ -228,46 +1057,25 @@ def scrape_all_offres_fne(url):
         elif type_lien == 2:
             complete_url = f"{url}/c_afficheoffre.php?reference=C04-OE-2025-{reference}"
         soup = scrape(complete_url)
+        compter_progression('FNE', pages=1)
         #test_if_empty(soup)
 
         print("Recherche des tableaux...")
-        table = soup.select_one('table div.telecharger_tableau table.table tbody')
+        champs = EXTRACTEURS_FNE[type_lien].extraire_premiere(soup)
 
-        if table is None and int(reference) > 33950 and type_lien == 1:
+        if champs is None and int(reference) > 33950 and type_lien == 1:
             count_type_lien1 += 1
 
-        if table is None and type_lien == 2 and int(reference) > 200:
+        if champs is None and type_lien == 2 and int(reference) > 200:
             count_type_lien2 += 1
 
-        if table is not None:
+        if champs is not None:
             print("Tableaux trouvés")
             count_type_lien1 = 0
             count_type_lien2 = 0
-            lien = complete_url
-            titre = table.select_one('tr:nth-child(2) td:nth-child(2) b.text-success').text.strip() if table.select_one(
-                'tr:nth-child(2) td:nth-child(2) b.text-success') else ''
-            compagnie = ''
-            cle = soup.find('td', string=lambda x: x and "Missions / Tâches" in x)
-            description = cle.find_next_sibling('td').text.strip() if cle else ''
-            cle = soup.find('td', string=lambda x: x and "Formation initiale" in x)
-            niveau_etude = cle.find_next_sibling('td').text.strip() if cle else ''
-            cle = soup.find('td', string=lambda x: x and "Durée de l'expérience professionnelle" in x)
-            experience = cle.find_next_sibling('td').text.strip() if cle else ''
-            type_contrat = table.select_one('tr:nth-child(6) td:nth-child(2)').text.strip() if table.select_one(
-                'tr:nth-child(6) td:nth-child(2)') else ''
-
-            number_child = 9 if type_lien == 1 else 8
-
-            lieu = table.select_one(f'tr:nth-child({number_child-1}) td:nth-child(2)').text.strip() if table.select_one(
-                'tr:nth-child(8) td:nth-child(2)') else ''
-            date_publication = ''
-            date_expiration = table.select_one(f'tr:nth-child({number_child}) td:nth-child(2)').text.strip() if table.select_one(
-                'tr:nth-child(9) td:nth-child(2)') else ''
-            print(f"Date d'expiration : {date_expiration}")
-            origine = 'FNE'
-
-            ajouter_offres(offres, lien, titre, compagnie, description, niveau_etude, experience, type_contrat, lieu,
-                       date_publication, date_expiration, origine)
+            print(f"Date d'expiration : {champs['date_expiration']}")
+
+            ajouter_offres(offres, complete_url, compagnie='', date_publication='', origine='FNE', **champs)
 
         if count_type_lien1 == 10 and type_lien == 1 :
             print(f"scraping terminé avec l'url de type {type_lien}: {complete_url}\n")
@@ -278,13 +1086,33 @@ def scrape_all_offres_fne(url):
 
         if count_type_lien2 == 100 :
             print("Opération terminée !")
+            terminer_reprise(url)
+            terminer_reprise_origine('FNE')
             break
 
         reference = incrementer_avec_zeros(reference)
+        if points_reprise is not None:
+            obtenir_ecrivain().vider()
+            points_reprise.avancer_fne(url, type_lien, reference)
 
     return offres
 
 
+#Champs de la page de détail d'une offre Louma Jobs
+EXTRACTEUR_DETAILS_LOUMAJOBS = Extracteur({
+    'compagnie': Champ("article .entreprise-title h2.h6 a",
+                       nettoyer=lambda valeur: valeur.lower().replace("en savoir plus sur", "").strip()),
+    'description': Champ("div.post-content .post-real-content p"),
+    'experience': Champ("article div:nth-child(4) ul li:nth-child(5) span",
+                        nettoyer=lambda valeur: valeur.lower().replace("expérience : ", "")),
+    'date_publication': Champ("article .entreprise-title span:nth-child(2)", nettoyer=convertir_en_date),
+    #'categorie': Champ("article div:nth-child(4) ul li:nth-child(5) span"),
+})
+
+def details_loumaJobs(soup):
+    details = EXTRACTEUR_DETAILS_LOUMAJOBS.extraire(soup)
+    return details['compagnie'], details['description'], details['experience'], details['date_publication']
+
 def scraper_offres_loumaJobs(url,driver):
 
     print(f"Connexion à l'url {url}...")
@@ -294,6 +1122,7 @@ def scraper_offres_loumaJobs(url,driver):
     print("Récupération des sections...")
     sections_blocks = driver.find_elements(By.CSS_SELECTOR, '.emploi')
     offres = []
+    offres_temp = []
 
     if sections_blocks is not None:
         print("Sections récupérés !")
@@ -306,76 +1135,84 @@ def scraper_offres_loumaJobs(url,driver):
             date_expiration = section.find_element(By.CSS_SELECTOR,".card_default__datepublication p").text.strip() if section.find_element(By.CSS_SELECTOR,".card_default__datepublication p") else ''
             date_expiration = date_expiration.lower().replace("date cloture : ", "")
 
-            print(f"Connexion à l'url {lien}...")
-            soup = scrape(lien)
-            print("Connexion réussie !")
-
-            compagnie = soup.select_one("article .entreprise-title h2.h6 a").text.strip() if soup.select_one("article .entreprise-title h2.h6 a") else ''
-            compagnie = compagnie.lower().replace("en savoir plus sur", "").strip()
-
-            description = soup.select_one("div.post-content .post-real-content p").text.strip() if soup.select_one("div.post-content .post-real-content p") else ''
+            if offre_a_ignorer('Louma Jobs', lien):
+                continue
+            offres_temp.append({
+                "lien": lien,
+                "lieu": lieu,
+                "titre": titre,
+                "type_contrat": type_contrat,
+                "date_expiration": date_expiration
+            })
+
+        # Les pages de détail sont servies en HTML simple : elles sont récupérées
+        # en parallèle par le moteur asynchrone s'il est actif
+        print(f"Connexion aux {len(offres_temp)} pages de détail...")
+        soups = obtenir_pages([offre["lien"] for offre in offres_temp], 'Louma Jobs', ['article'])
+        print("Connexion réussie !")
+
+        for offre, soup in zip(offres_temp, soups):
+            if soup is None:
+                continue
+            compagnie, description, experience, date_publication = details_loumaJobs(soup)
             niveau_etude = ''
-
-            experience = soup.select_one("article div:nth-child(4) ul li:nth-child(5) span").text.strip() if soup.select_one("article div:nth-child(4) ul li:nth-child(5) span") else ''
-            experience = experience.lower().replace("expérience : ", "")
-
-            date_publication = soup.select_one( "article .entreprise-title span:nth-child(2)").text.strip() if soup.select_one( "article .entreprise-title span:nth-child(2)") else ''
-            date_publication = convertir_en_date(date_publication)
-
-            #categorie = soup.select_one("article div:nth-child(4) ul li:nth-child(5) span").text.strip() if soup.select_one("article div:nth-child(4) ul li:nth-child(5) span") else ''
             origine = 'Louma Jobs'
 
-            ajouter_offres(offres, lien, titre, compagnie, description, niveau_etude, experience, type_contrat, lieu,date_publication, date_expiration, origine)
+            ajouter_offres(offres, offre["lien"], offre["titre"], compagnie, description, niveau_etude, experience,
+                           offre["type_contrat"], offre["lieu"], date_publication, offre["date_expiration"], origine)
 
     return offres
 def scrape_all_pages_loumaJobs(url,driver):
-    scrape_all_pages(url, scraper_offres_loumaJobs, "path", driver=driver, first=827)
+    scrape_all_pages(url, scraper_offres_loumaJobs, "path", driver=driver, first=827, origine='Louma Jobs')
+    terminer_reprise_origine('Louma Jobs')
+
 
+#Champs d'une carte de la liste Minajobs et de la page de détail
+EXTRACTEUR_MINAJOBS = Extracteur(carte='.desktop-listing-content', champs={
+    'titre': Champ(".listing-title"),
+    'lien': Champ("b a", attribut='href', prefixe='https://cameroun.minajobs.net'),
+    'compagnie': Champ("div.listing-info span.opaque"),
+    'lieu': Champ("div.listing-info span.opaque:nth-child(4)"),
+})
+EXTRACTEUR_DETAILS_MINAJOBS = Extracteur({
+    'date_publication': Champ('.job-detail-icons .listing-icon:nth-child(2)', texte_suivant=True,
+                              nettoyer=lambda valeur: valeur.replace("Date de publication :", "").strip()),
+    'description': Champ("div.detail-font"),
+})
 
-def scraper_offres_minajobs(url, driver):
+def scraper_offres_minajobs(url, driver, pool=None):
 
     print(f"Connexion à l'url {url}...")
-    safe_get(driver, url)
+    soup_page = obtenir_pages([url], 'minajobs', ['.desktop-listing-content'], driver=driver)[0]
     print("Connexion réussie !")
 
     print("Récupération des balises li...")
-    balises_li = driver.find_elements(By.CSS_SELECTOR, '.desktop-listing-content')
     offres = []
     offres_temp = []
     liens_offres = []
 
 
-    for li in balises_li:
-        html = li.get_attribute("outerHTML")
-        soup = BeautifulSoup(html, 'html.parser')
-
-        titre = soup.select_one(".listing-title").text.strip() if soup.select_one(".listing-title") else ''
-        lien = 'https://cameroun.minajobs.net' + soup.select_one("b a").get('href') if soup.select_one("b a") else ''
-        liens_offres.append(lien)
-        compagnie = soup.select_one("div.listing-info span.opaque").text.strip() if soup.select_one(
-            "div.listing-info") else ''
-        lieu = soup.select_one("div.listing-info span.opaque:nth-child(4)").text.strip() if soup.select_one(
-            "div.listing-info") else ''
-
-        offres_temp.append({
-            "titre": titre,
-            "lien": lien,
-            "compagnie": compagnie,
-            "lieu": lieu
-        })
+    for champs in EXTRACTEUR_MINAJOBS.extraire_tout(soup_page):
+        if offre_a_ignorer('minajobs', champs["lien"]):
+            continue
+        offres_temp.append(champs)
+        liens_offres.append(champs["lien"])
     print("Nombre d'offres trouvées :", len(offres_temp))
 
-    for i, offre in enumerate(offres_temp, start=1):
-        print(f"Connexion à l'url de l'offre No : {i}: {offre["lien"]}")
-        safe_get(driver, offre["lien"])
-        soup_lien = BeautifulSoup(driver.page_source, 'html.parser')
-
-        date_publication = soup_lien.select_one('.job-detail-icons .listing-icon:nth-child(2)')
-        date_publication = date_publication.next_sibling.strip().replace("Date de publication :",
-                                                                         "").strip() if date_publication else ''
-
-        description = soup_lien.select_one("div.detail-font")
-        description = description.text.strip() if description else ''
+    # Les cartes inchangées reprennent les détails déjà lus
+    details_offres = [details_memorises('minajobs', offre) for offre in offres_temp]
+    a_telecharger = [i for i, details in enumerate(details_offres) if details is None]
+    print(f"Connexion aux {len(a_telecharger)} pages de détail...")
+    soups = obtenir_pages([liens_offres[i] for i in a_telecharger], 'minajobs', ['div.detail-font'], driver=driver, pool=pool)
+    for i, soup_lien in zip(a_telecharger, soups):
+        if soup_lien is not None:
+            details_offres[i] = EXTRACTEUR_DETAILS_MINAJOBS.extraire(soup_lien)
+            memoriser_details('minajobs', offres_temp[i], details_offres[i])
+
+    for offre, details in zip(offres_temp, details_offres):
+        if details is None:
+            continue
+        date_publication, description = details['date_publication'], details['description']
 
         # Ajout via ta fonction
         ajouter_offres(
@@ -391,44 +1228,47 @@ def scraper_offres_minajobs(url, driver):
 
     print("Toutes les offres ont été traitées !")
     return offres
-def scrape_all_pages_minajobs(url,driver,first):
-    scrape_all_pages(url=url, fonction_scraping=scraper_offres_minajobs,  format_page="query" , driver=driver , first=first, type_format="p")
-
-
-def scraper_offres_optioncarriere():
+def scrape_all_pages_minajobs(url,driver,first,pool=None):
+    fonction_scraping = partial(scraper_offres_minajobs, pool=pool) if pool is not None else scraper_offres_minajobs
+    scrape_all_pages(url=url, fonction_scraping=fonction_scraping,  format_page="query" , driver=driver , first=first, type_format="p", origine='minajobs')
+    terminer_reprise_origine('minajobs')
+
+
+#Champs de la liste OptionCarriere (lien de chaque offre) et de la page de détail
+EXTRACTEUR_OPTIONCARRIERE = Extracteur(carte='#search-content ul.jobs article', champs={
+    'lien': Champ('header a', attribut='href', prefixe='https://www.optioncarriere.cm'),
+    'titre': Champ('header a'),
+})
+EXTRACTEUR_DETAILS_OPTIONCARRIERE = Extracteur(carte='article', champs={
+    'type_contrat': Champ('ul.details li:nth-child(2)'),
+    'titre': Champ('h1'),
+    'compagnie': Champ('header p.company'),
+    'lieu': Champ('ul.details span'),
+    'date_publication': Champ('ul.tags span.badge', nettoyer=convertir_en_date),
+    'description': Champ('section.content'),
+})
+
+def scraper_offres_optioncarriere(concurrence=1):
     def scraper_offres_optioncarriere_region(url):
         print(f"Récupération des offres pour la région : {nom_region}")
         soup = scrape(url)
         print('HTML récupérées pour la région :', nom_region)
         offres = []
 
-        contents = soup.select('#search-content ul.jobs article') if soup else None
-        if contents:
-            for content in contents:
-                lien_offre = 'https://www.optioncarriere.cm' + content.select_one('header a').get(
-                    'href') if content.select_one('header a') else ''
-                print('lien offres :', lien_offre)
-                soup_offre = scrape(lien_offre)
-                if soup_offre:
-                    article = soup_offre.select_one('article')
-                    if article:
-                        type_contrat = article.select_one('ul.details li:nth-child(2)').text.strip() if article.select_one(
-                            'ul.details li:nth-child(2)') else ''
-                        if type_contrat.lower() != 'stage':
-                            titre = article.select_one('h1').text.strip() if article.select_one('h1') else ''
-                            compagnie = article.select_one('header p.company').text.strip() if article.select_one(
-                                'header p.company') else ''
-                            lieu = article.select_one('ul.details span').text.strip() if article.select_one(
-                                'ul.details span') else ''
-                            date_publication = article.select_one('ul.tags span.badge').text.strip() if article.select_one(
-                                'ul.tags span.badge') else ''
-                            date_publication = convertir_en_date(date_publication)
-                            description = article.select_one('section.content').text.strip() if article.select_one(
-                                'section.content') else ''
-
-                            ajouter_offres(offres, lien_offre, titre, compagnie, description, niveau_etude='',
-                                           experience='', type_contrat=type_contrat, lieu=lieu, date_publication=date_publication,
-                                           date_expiration='', origine='optioncarriere')
+        for carte in EXTRACTEUR_OPTIONCARRIERE.extraire_tout(soup):
+            lien_offre = carte['lien']
+            print('lien offres :', lien_offre)
+            if offre_a_ignorer('optioncarriere', lien_offre):
+                continue
+            details = details_memorises('optioncarriere', carte)
+            if details is None:
+                details = EXTRACTEUR_DETAILS_OPTIONCARRIERE.extraire_premiere(scrape(lien_offre))
+                if details is not None:
+                    memoriser_details('optioncarriere', carte, details)
+            if details and details['type_contrat'].lower() != 'stage':
+                ajouter_offres(offres, lien_offre, niveau_etude='', experience='', date_expiration='',
+                               origine='optioncarriere', **details)
+        return offres
 
     regions = (
             {'Littoral': 'https://www.optioncarriere.cm/emploi/R%C3%A9gion-du-Littoral', },
@@ -445,61 +1285,231 @@ def scraper_offres_optioncarriere():
     for region in regions:
         for nom_region, url_region in region.items():
             if nom_region == 'Sud':
-                scrape_all_pages(url_region, scraper_offres_optioncarriere_region, first=1 , format_page='query', type_format='p')
+                scrape_all_pages(url_region, scraper_offres_optioncarriere_region, first=1 , format_page='query', type_format='p', concurrence=concurrence, origine='optioncarriere')
+    terminer_reprise_origine('optioncarriere')
 
 
 
 # Permet d'attendre que la page soit chargée avant de continuer en utilisant selenium
-def safe_get(driver, url, max_retries=3, delay=2):
+def safe_get(driver, url, max_retries=3):
     """
-    Tente de charger une URL avec un nombre défini de tentatives et un délai entre chaque.
+    Tente de charger une URL avec un nombre défini de tentatives.
+    Chaque tentative attend son tour auprès du planificateur de l'hôte.
 
     :param driver: Instance de WebDriver (ex: webdriver.Chrome())
     :param url: URL à charger
     :param max_retries: Nombre maximum de tentatives
-    :param delay: Délai (en secondes) entre chaque tentative
     """
     for attempt in range(1, max_retries + 1):
+        planificateur.attendre(url)
+        debut = time.monotonic()
         try:
             driver.get(url)
+            planificateur.signaler(url, latence=time.monotonic() - debut)
             return  # Succès
         except Exception as e:
+            planificateur.signaler(url, timeout=True)
             print(f"[Tentative {attempt}/{max_retries}] Échec : {e}")
             if attempt == max_retries:
                 print("Toutes les tentatives ont échoué.")
                 raise
-            time.sleep(delay)
 
-#Fonction permettant de parcourir les pages
-def scrape_all_pages(url, fonction_scraping , format_page, driver=None, first = 0, type_format = "page"):
-    choice_format = ''
-    page = first
-    count_not_offre = 0
+#Fonction permettant de construire l'url d'une page
+def url_de_page(url, format_page, page, type_format="page"):
+    if format_page == "path":
+        return f"{url}/page/{page + 1}"
+    elif format_page == "query":
+        return f"{url}?{type_format}={page}"
+    return ''
 
-    while True:
-        if format_page == "path":
-            choice_format = f"{url}/page/{page + 1}"
-        elif format_page == "query":
-            choice_format = f"{url}?{type_format}={page}"
+#Pool de navigateurs Selenium
+class PoolNavigateurs:
+    """
+    Pool de navigateurs headless alimenté par une file de travail.
+    Chaque thread possède son propre navigateur, lancé au premier besoin. Un navigateur
+    qui plante est fermé puis relancé avant de réessayer l'url. map() rend les
+    résultats dans l'ordre des urls.
 
-        url_page = choice_format
+    :param taille: Nombre de navigateurs (par défaut un par cœur)
+    :param max_essais: Nombre de tentatives par url, avec relance du navigateur entre chaque
+    """
+    def __init__(self, taille=None, max_essais=2):
+        self.taille = taille or os.cpu_count() or 2
+        self.max_essais = max_essais
+        self._file = queue.Queue()
+        self._threads = [threading.Thread(target=self._travailler, daemon=True) for _ in range(self.taille)]
+        for thread in self._threads:
+            thread.start()
+
+    def _travailler(self):
+        driver = None
+        while True:
+            tache = self._file.get()
+            if tache is None:
+                break
+            fonction, url, futur = tache
+            for essai in range(1, self.max_essais + 1):
+                try:
+                    if driver is None:
+                        driver = start_browser()
+                    futur.set_result(fonction(driver, url))
+                    break
+                except WebDriverException as e:
+                    print(f"[Navigateur {essai}/{self.max_essais}] Plantage sur {url} : {e}")
+                    fermer_driver(driver)
+                    driver = None
+                    if essai == self.max_essais:
+                        futur.set_exception(e)
+                except Exception as e:
+                    futur.set_exception(e)
+                    break
+        fermer_driver(driver)
+
+    def map(self, fonction, urls):
+        """
+        Applique fonction(driver, url) à chaque url. Une url en échec donne None.
+        """
+        futurs = []
+        for url in urls:
+            futur = Future()
+            self._file.put((fonction, url, futur))
+            futurs.append(futur)
+
+        resultats = []
+        for url, futur in zip(urls, futurs):
+            try:
+                resultats.append(futur.result())
+            except Exception as e:
+                print(f"Échec pour l'url {url} : {e}")
+                resultats.append(None)
+        return resultats
+
+    def fermer(self):
+        for _ in self._threads:
+            self._file.put(None)
+        for thread in self._threads:
+            thread.join()
+
+#Mode de rendu par site (clé : origine) :
+# - 'http' : requête simple uniquement
+# - 'navigateur' : Selenium uniquement
+# - 'auto' : requête simple d'abord, navigateur si les sélecteurs requis sont absents
+modes_rendu = {
+    'minajobs': 'auto',
+    'Louma Jobs': 'http',
+}
+compteurs_rendu = {}
+verrou_compteurs = threading.Lock()
 
-        print(f"Scraping page {page}...")
-        #print(f"Connexion à l'url {url_page}")
-        offres_page = fonction_scraping(url_page) if driver == None else fonction_scraping(url_page,driver)
+def compter_rendu(site, cle, nombre=1):
+    with verrou_compteurs:
+        compteurs = compteurs_rendu.setdefault(site, {'http': 0, 'navigateur': 0, 'repli': 0})
+        compteurs[cle] += nombre
 
-        count_not_offre = (count_not_offre + 1) if not offres_page else 0
+# Fonction permettant de charger une page dans un navigateur et d'en récupérer le HTML
+def page_navigateur(driver, url):
+    safe_get(driver, url)
+    return analyser_html(driver.page_source)
 
-        if not offres_page and count_not_offre > 5:
-            print("Fin de la pagination !")
-            break
-        print("Données ajoutées !")
-        print('Repos !')
-        page += 1
+# Fonction permettant de récupérer des pages selon le mode de rendu du site
+def obtenir_pages(urls, site, selecteurs_requis=(), driver=None, pool=None, mode=None):
+    """
+    Retourne les pages analysées des urls (dans l'ordre) selon modes_rendu[site] (ou mode).
+    En mode 'auto', seules les pages où un sélecteur requis manque repassent par le navigateur.
+
+    :param urls: Urls à récupérer
+    :param site: Origine des offres (clé de modes_rendu)
+    :param selecteurs_requis: Sélecteurs CSS qui doivent être présents dans la page
+    :param driver: Navigateur utilisé à défaut de pool
+    :param pool: PoolNavigateurs utilisé pour les pages à rendre
+    :param mode: Mode de rendu imposé ('http', 'navigateur' ou 'auto')
+    """
+    mode = mode or modes_rendu.get(site, 'navigateur' if driver is not None or pool is not None else 'http')
+    soups = [None] * len(urls)
+    a_rendre = list(range(len(urls)))
+    compter_progression(site, pages=len(urls))
+
+    if mode in ('http', 'auto'):
+        for i, soup in enumerate(scrape_plusieurs(urls)):
+            if soup is not None and all(contient(soup, selecteur) for selecteur in selecteurs_requis):
+                soups[i] = soup
+        a_rendre = [i for i, soup in enumerate(soups) if soup is None]
+        compter_rendu(site, 'http', len(urls) - len(a_rendre))
+        if mode == 'http' or (driver is None and pool is None):
+            return soups
+        compter_rendu(site, 'repli', len(a_rendre))
+
+    if pool is not None:
+        rendues = pool.map(page_navigateur, [urls[i] for i in a_rendre])
+    else:
+        rendues = [page_navigateur(driver, urls[i]) for i in a_rendre]
+    for i, soup in zip(a_rendre, rendues):
+        soups[i] = soup
+    compter_rendu(site, 'navigateur', len(a_rendre))
+    return soups
+
+# Fonction permettant d'afficher le taux de réussite de chaque mode de rendu
+def rapport_rendu():
+    for site, compteurs in compteurs_rendu.items():
+        total = sum(compteurs.values()) - compteurs['repli']
+        taux_http = compteurs['http'] / (compteurs['http'] + compteurs['repli']) * 100 if compteurs['http'] + compteurs['repli'] else 0
+        print(f"{site} : {compteurs['http']} pages en HTTP, {compteurs['navigateur']} avec le navigateur "
+              f"({compteurs['repli']} replis), {taux_http:.0f}% de réussite HTTP sur {total} pages")
 
-        time.sleep(2)
-        print('Reprise...')
-    return "Scraping terminé !"
+#Fonction permettant de parcourir les pages
+def scrape_all_pages(url, fonction_scraping , format_page, driver=None, first = 0, type_format = "page", concurrence=1, origine=None):
+    """
+    Parcourt les pages d'un site jusqu'à six pages vides consécutives.
+
+    :param concurrence: Nombre de pages traitées en parallèle (sans driver uniquement).
+                        Utiliser avec activer_moteur_async() pour borner les requêtes par hôte.
+    :param origine: Origine des offres, utilisée par le mode incrémental pour arrêter la
+                    pagination dès que les offres déjà enregistrées sont atteintes
+    """
+    page = first
+    count_not_offre = 0
+    if points_reprise is not None:
+        page = points_reprise.curseur(url, first)
+        print(f"Reprise à la page {page}")
+    if index_connues is not None and origine is not None:
+        index_connues.reinitialiser(origine)
+    if driver is not None:
+        concurrence = 1
+    executeur = ThreadPoolExecutor(max_workers=concurrence) if concurrence > 1 else None
+
+    try:
+        while True:
+            pages = list(range(page, page + concurrence))
+            urls_pages = [url_de_page(url, format_page, p, type_format) for p in pages]
+
+            print(f"Scraping page {page}..." if concurrence == 1 else f"Scraping pages {pages[0]} à {pages[-1]}...")
+            if executeur is not None:
+                resultats = list(executeur.map(fonction_scraping, urls_pages))
+            else:
+                resultats = [fonction_scraping(urls_pages[0]) if driver == None else fonction_scraping(urls_pages[0], driver)]
+
+            # Les résultats sont examinés dans l'ordre des pages
+            for offres_page in resultats:
+                count_not_offre = (count_not_offre + 1) if not offres_page else 0
+
+                if not offres_page and count_not_offre > 5:
+                    print("Fin de la pagination !")
+                    terminer_reprise(url)
+                    return "Scraping terminé !"
+            print("Données ajoutées !")
+            page += len(pages)
+
+            if index_connues is not None and origine is not None and index_connues.arret_atteint(origine):
+                print(f"{index_connues.seuil} offres déjà connues à la suite : fin de la pagination !")
+                terminer_reprise(url)
+                return "Scraping terminé !"
+            if points_reprise is not None:
+                # Les offres des pages terminées doivent être sur disque avant d'avancer le curseur
+                obtenir_ecrivain().vider()
+                points_reprise.avancer(url, page)
+    finally:
+        if executeur is not None:
+            executeur.shutdown()
 
 #Enregistrement des données dans un fichier CSV
 def save_to_file(offres, filename, save_type='w', extension='csv'):
@@ -538,33 +1548,14 @@ def start_browser():
     driver = webdriver.Chrome(service=service, options=options)
     return driver
 
-# Fonction permettant de convertir des expressions régulière ou non en date
-def convertir_en_date(relative_date_str):
-    """
-    Convertit une expression relative comme "il y a 3 jours" ou "6 months ago" en une date exacte.
-    Retourne un objet datetime.date correspondant.
-    """
-    if not relative_date_str:
-        return None
-
-    # 🔹 Nettoyer la chaîne : extraire uniquement la partie utile
-    # Exemple : "publié il y a 45 minutes." → "il y a 45 minutes"
-    match = re.search(r"(il y a .+|.+ ago)", relative_date_str.lower())
-    if match:
-        relative_date_str = match.group(1)
-
-    # 🔹 Utiliser dateparser
-    date = dateparser.parse(relative_date_str, settings={
-        'RELATIVE_BASE': datetime.now(),
-        'PREFER_DATES_FROM': 'past',
-        'TIMEZONE': 'UTC',
-        'RETURN_AS_TIMEZONE_AWARE': False
-    })
-
-    if date:
-        return date.date()
-    else:
-        return None
+# Fonction permettant de fermer un navigateur sans lever d'erreur s'il a déjà planté
+def fermer_driver(driver):
+    if driver is None:
+        return
+    try:
+        driver.quit()
+    except Exception as e:
+        print(f"Fermeture du navigateur impossible : {e}")
 
 """examples = [
     'il y a 1 heure',
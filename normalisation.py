@@ -0,0 +1,158 @@
+import argparse
+import os
+
+import pandas as pd
+
+from geocodage import FICHIER_LIEUX_SUPPLEMENTAIRES, IndexVilles, lire_referentiel
+from normalisation_dates import normaliser_serie_dates
+from stockage import CHAMPS_OFFRE, COLONNES_DATES, lire_offres_parquet, lire_offres_sqlite
+
+#Colonnes de texte simple ; lieu et type_contrat peuvent contenir plusieurs valeurs (ex: "Douala, Yaoundé")
+COLONNES_TEXTE = ['lien', 'titre', 'compagnie', 'description', 'niveau_etude', 'experience']
+
+#Fichiers du jeu normalisé
+FICHIER_OFFRES = 'offres.parquet'
+FICHIER_LIEUX = 'lieux.parquet'
+FICHIER_CONTRATS = 'contrats.parquet'
+
+# Séparateurs entre plusieurs valeurs d'un même champ (le tiret seul fait partie des noms : abong-mbang)
+RE_SEPARATEURS = r"\s*(?:[,;/|]|\s-\s|\bet\b)\s*"
+
+
+# Fonction permettant de passer un champ multiple en forme longue : une ligne par (offre, valeur)
+def eclater_valeurs(serie):
+    """
+    Découpe chaque texte en ses différentes valeurs, nettoyées et sans doublon par offre.
+    Le découpage n'est fait qu'une fois par texte distinct.
+
+    :param serie: Series de textes, indexée par l'identifiant de l'offre
+    :return: Series longue (index = identifiant de l'offre)
+    """
+    codes, textes = pd.factorize(serie.astype('string').str.strip(), use_na_sentinel=True)
+    valeurs = pd.Series(textes, dtype='string').str.lower().str.replace(r"^\[|\]$", '', regex=True)
+    valeurs = valeurs.str.split(RE_SEPARATEURS, regex=True).explode().str.strip(" '\"")
+    valeurs = valeurs[valeurs.notna() & (valeurs != '')]
+
+    # On rattache les valeurs de chaque texte distinct aux offres qui le contiennent
+    correspondance = pd.DataFrame({'code': valeurs.index, 'valeur': valeurs.values})
+    offres = pd.DataFrame({'id_offre': serie.index, 'code': codes})
+    longue = offres.merge(correspondance, on='code').drop_duplicates(['id_offre', 'valeur'])
+    return longue.set_index('id_offre')['valeur']
+
+
+# Fonction permettant de ramener les villes à leur nom dans le fichier de référence
+def canoniser_villes(valeurs, df_villes_regions):
+    """
+    Remplace chaque lieu reconnu par le nom de ville du fichier de référence et y associe sa région.
+    La recherche passe par l'index des villes (voir geocodage.IndexVilles) : casse, accents, variantes
+    d'orthographe et texte libre ("Douala, Littoral") sont reconnus, chaque lieu distinct n'est résolu qu'une fois.
+    Les lieux non reconnus sont conservés tels quels, avec une région vide ; une région ou le pays
+    mentionnés seuls à côté d'une ville sont retirés.
+
+    :param valeurs: Series des lieux (forme longue)
+    :param df_villes_regions: DataFrame avec les colonnes villes et regions
+    :return: DataFrame (lieu, region) indexé comme valeurs
+    """
+    referentiel = pd.concat([df_villes_regions, lire_referentiel((FICHIER_LIEUX_SUPPLEMENTAIRES,))], ignore_index=True)
+    resolus = IndexVilles(referentiel).resoudre_longue(valeurs)
+    return pd.DataFrame({
+        'lieu': resolus['ville'].fillna(resolus['lieu']).astype('string'),
+        'region': resolus['region'].astype('string'),
+    }, index=resolus.index)
+
+
+# Fonction permettant de produire le jeu de données propre et typé
+def normaliser_offres(df, df_villes_regions=None):
+    """
+    Normalise les offres brutes en une seule passe :
+    - une offre par lien (la dernière récupérée est gardée),
+    - dates converties en datetime,
+    - lieu et type_contrat découpés, nettoyés et codés en catégories,
+    - villes ramenées aux noms du fichier villes-régions.
+
+    :param df: DataFrame des offres brutes
+    :param df_villes_regions: Référentiel des villes (colonnes villes, regions), optionnel
+    :return: dictionnaire {'offres', 'lieux', 'contrats'} ; les tables lieux et contrats sont
+             en forme longue, reliées aux offres par id_offre
+    """
+    offres = df.reindex(columns=CHAMPS_OFFRE).copy()
+    offres['lien'] = offres['lien'].astype('string').str.strip()
+    offres = pd.concat([
+        offres[offres['lien'].isna() | (offres['lien'] == '')],
+        offres[offres['lien'].notna() & (offres['lien'] != '')].drop_duplicates('lien', keep='last'),
+    ]).sort_index().reset_index(drop=True)
+    offres.index.name = 'id_offre'
+
+    for colonne in COLONNES_TEXTE:
+        offres[colonne] = offres[colonne].astype('string').str.strip()
+    for colonne in COLONNES_DATES:
+        offres[colonne] = normaliser_serie_dates(offres[colonne]).astype('datetime64[ns]')
+    offres['origine'] = offres['origine'].astype('string').str.strip().fillna('inconnue').astype('category')
+
+    lieux = eclater_valeurs(offres['lieu'])
+    if df_villes_regions is not None:
+        lieux = canoniser_villes(lieux, df_villes_regions)
+    else:
+        lieux = pd.DataFrame({'lieu': lieux, 'region': pd.Series(pd.NA, index=lieux.index, dtype='string')})
+    lieux = lieux.reset_index().drop_duplicates(['id_offre', 'lieu'])
+    contrats = eclater_valeurs(offres['type_contrat']).rename('type_contrat').reset_index()
+
+    # Les listes par offre sont gardées pour les vues qui raisonnent offre par offre
+    for colonne, table in (('lieu', lieux), ('type_contrat', contrats)):
+        listes = table[colonne].astype(object).groupby(table['id_offre']).agg(list).reindex(offres.index)
+        offres[colonne] = listes.map(lambda valeurs: valeurs if isinstance(valeurs, list) else [])
+
+    for table, colonnes in ((lieux, ['lieu', 'region']), (contrats, ['type_contrat'])):
+        for colonne in colonnes:
+            table[colonne] = table[colonne].astype('category')
+        table['id_offre'] = table['id_offre'].astype('int32')
+
+    return {'offres': offres.reset_index(), 'lieux': lieux, 'contrats': contrats}
+
+
+# Fonction permettant d'écrire le jeu normalisé
+def ecrire_jeu_normalise(tables, dossier='offres_normalisees'):
+    os.makedirs(dossier, exist_ok=True)
+    for nom, fichier in (('offres', FICHIER_OFFRES), ('lieux', FICHIER_LIEUX), ('contrats', FICHIER_CONTRATS)):
+        # Écriture dans un fichier temporaire puis remplacement : le dashboard ne lit jamais un fichier partiel
+        chemin = os.path.join(dossier, fichier)
+        tables[nom].to_parquet(chemin + '.tmp', engine='pyarrow', index=False)
+        os.replace(chemin + '.tmp', chemin)
+
+
+# Fonction permettant de lire le jeu normalisé
+def lire_jeu_normalise(dossier='offres_normalisees', colonnes=None):
+    """
+    :param colonnes: Colonnes de la table des offres à charger (toutes par défaut)
+    :return: dictionnaire {'offres', 'lieux', 'contrats'}
+    """
+    if colonnes is not None:
+        colonnes = ['id_offre'] + [colonne for colonne in colonnes if colonne != 'id_offre']
+    return {
+        'offres': pd.read_parquet(os.path.join(dossier, FICHIER_OFFRES), engine='pyarrow', columns=colonnes),
+        'lieux': pd.read_parquet(os.path.join(dossier, FICHIER_LIEUX), engine='pyarrow'),
+        'contrats': pd.read_parquet(os.path.join(dossier, FICHIER_CONTRATS), engine='pyarrow'),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Normalisation des offres récupérées par les scrapers")
+    parser.add_argument("--csv", metavar="FICHIER", default="offres_emploi.csv", help="Fichier CSV des offres brutes")
+    parser.add_argument("--parquet", metavar="DOSSIER", help="Lire les offres depuis ce dossier Parquet")
+    parser.add_argument("--sqlite", metavar="FICHIER", help="Lire les offres depuis cette base SQLite")
+    parser.add_argument("--villes", metavar="FICHIER", default="df_ville_region_count.csv", help="Référentiel villes-régions")
+    parser.add_argument("--sortie", metavar="DOSSIER", default="offres_normalisees", help="Dossier du jeu normalisé")
+    args = parser.parse_args()
+
+    if args.parquet:
+        df = lire_offres_parquet(args.parquet)
+    elif args.sqlite:
+        df = lire_offres_sqlite(args.sqlite)
+    else:
+        df = pd.read_csv(args.csv, dtype=str, keep_default_na=False)
+    df_villes_regions = pd.read_csv(args.villes) if os.path.exists(args.villes) else None
+
+    tables = normaliser_offres(df, df_villes_regions)
+    ecrire_jeu_normalise(tables, args.sortie)
+    print(f"{len(tables['offres'])} offres normalisées ({len(tables['lieux'])} lieux, "
+          f"{len(tables['contrats'])} contrats) écrites dans {args.sortie}")
@@ -0,0 +1,127 @@
+import re
+from datetime import datetime, date, time
+from functools import lru_cache
+
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+#Expressions courantes reconnues sans dateparser
+RE_IL_Y_A = re.compile(r"il y a\s+(\d+|une?)\s+(secondes?|minutes?|heures?|jours?|semaines?|mois|années?|ans?)\b")
+RE_AGO = re.compile(r"\b(\d+|an?|one)\s+(seconds?|minutes?|hours?|days?|weeks?|months?|years?)\s+ago\b")
+RE_JOUR_NOMME = re.compile(r"\b(avant-hier|hier|yesterday|aujourd'hui|aujourd’hui|today)\b")
+RE_JJ_MM_AAAA = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})\b")
+RE_AAAA_MM_JJ = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+RE_RELATIF = re.compile(r"(il y a .+|.+ ago)")
+
+# Unité (préfixe du mot) -> argument de relativedelta
+UNITES = [
+    ('seconde', 'seconds'), ('second', 'seconds'), ('minute', 'minutes'), ('heure', 'hours'), ('hour', 'hours'),
+    ('jour', 'days'), ('day', 'days'), ('semaine', 'weeks'), ('week', 'weeks'), ('mois', 'months'),
+    ('month', 'months'), ('an', 'years'), ('year', 'years'),
+]
+DECALAGES_NOMMES = {
+    'avant-hier': 2, 'hier': 1, 'yesterday': 1,
+    "aujourd'hui": 0, 'aujourd’hui': 0, 'today': 0,
+}
+
+
+def _date_relative(nombre, unite, jour):
+    nombre = int(nombre) if nombre.isdigit() else 1
+    for prefixe, argument in UNITES:
+        if unite.startswith(prefixe):
+            # Les durées courtes sont comptées depuis midi du jour de référence
+            return (datetime.combine(jour, time(12)) - relativedelta(**{argument: nombre})).date()
+    return None
+
+
+def _date_valide(annee, mois, jour):
+    try:
+        return date(int(annee), int(mois), int(jour))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=100_000)
+def _normaliser(texte, jour):
+    correspondance = RE_IL_Y_A.search(texte) or RE_AGO.search(texte)
+    if correspondance:
+        return _date_relative(correspondance.group(1), correspondance.group(2), jour)
+
+    correspondance = RE_JOUR_NOMME.search(texte)
+    if correspondance:
+        return jour - relativedelta(days=DECALAGES_NOMMES[correspondance.group(1)])
+
+    correspondance = RE_JJ_MM_AAAA.search(texte)
+    if correspondance:
+        return _date_valide(correspondance.group(3), correspondance.group(2), correspondance.group(1))
+
+    correspondance = RE_AAAA_MM_JJ.search(texte)
+    if correspondance:
+        return _date_valide(*correspondance.groups())
+
+    # Cas non couverts : dateparser (lent à importer et à exécuter, d'où l'import tardif)
+    import dateparser
+
+    correspondance = RE_RELATIF.search(texte)
+    if correspondance:
+        texte = correspondance.group(1)
+    resultat = dateparser.parse(texte, settings={
+        'RELATIVE_BASE': datetime.combine(jour, time(12)),
+        'PREFER_DATES_FROM': 'past',
+        'TIMEZONE': 'UTC',
+        'RETURN_AS_TIMEZONE_AWARE': False
+    })
+    return resultat.date() if resultat else None
+
+
+# Fonction permettant de convertir une expression de date en date exacte
+def normaliser_date(texte, reference=None):
+    """
+    Convertit "il y a 3 jours", "6 months ago", "hier", "12/03/2025"... en datetime.date.
+    Les résultats sont mis en cache par (texte, jour de référence).
+
+    :param texte: Expression à convertir
+    :param reference: Jour de référence des expressions relatives (aujourd'hui par défaut)
+    """
+    if texte is None or (not isinstance(texte, str) and pd.isna(texte)):
+        return None
+    if isinstance(texte, datetime):
+        return texte.date()
+    if isinstance(texte, date):
+        return texte
+    texte = str(texte).strip().lower()
+    if not texte:
+        return None
+    if reference is None:
+        reference = date.today()
+    elif isinstance(reference, datetime):
+        reference = reference.date()
+    return _normaliser(texte, reference)
+
+
+# Fonction permettant de convertir toute une colonne de dates
+def normaliser_serie_dates(serie, reference=None):
+    """
+    Version vectorisée de normaliser_date pour une Series pandas (retourne du datetime64).
+    Les formats jj/mm/aaaa et aaaa-mm-jj sont convertis par pandas en une passe, les autres
+    valeurs ne sont converties qu'une fois par texte distinct.
+
+    :param serie: Series de textes ou de dates
+    :param reference: Jour de référence des expressions relatives (aujourd'hui par défaut)
+    """
+    textes = serie.astype('string').str.strip()
+    # pandas traduit "today" et "now" par l'instant présent (heure comprise, sans tenir compte de
+    # reference) : ces textes passent par normaliser_date comme les autres expressions relatives
+    litteraux = textes.str.lower().isin(['today', 'now']).fillna(False).astype(bool)
+    resultat = pd.to_datetime(textes.mask(litteraux), format='%d/%m/%Y', exact=False, errors='coerce')
+
+    manquants = resultat.isna() & textes.notna() & (textes != '') & ~litteraux
+    if manquants.any():
+        resultat.loc[manquants] = pd.to_datetime(textes[manquants], format='%Y-%m-%d', exact=False, errors='coerce')
+
+    manquants = resultat.isna() & textes.notna() & (textes != '')
+    if manquants.any():
+        correspondances = {texte: normaliser_date(texte, reference) for texte in textes[manquants].unique()}
+        resultat.loc[manquants] = pd.to_datetime(textes[manquants].map(correspondances), errors='coerce')
+    # Comme normaliser_date : des jours, sans heure
+    return resultat.dt.normalize()
@@ -1,10 +1,48 @@
-from main import start_browser, scrape_all_pages_minajobs
+import argparse
+
+from main import start_browser, scrape_all_pages_minajobs, PoolNavigateurs, rapport_rendu, activer_reprise, \
+    activer_mode_incremental, configurer_ecrivain, activer_empreintes, activer_cache_http
+from stockage import StockageParquet, StockageSQLite
+
+parser = argparse.ArgumentParser(description="Scraping des offres Minajobs")
+parser.add_argument("--first", type=int, default=300, help="Première page à scraper")
+parser.add_argument("--resume", action="store_true", help="Reprendre là où le dernier crawl s'est arrêté")
+parser.add_argument("--incremental", action="store_true", help="S'arrêter dès que les offres déjà enregistrées sont atteintes")
+parser.add_argument("--seuil", type=int, default=20, help="Nombre d'offres connues consécutives qui arrête la pagination")
+parser.add_argument("--empreintes", action="store_true", help="Ne relire une page de détail que si la carte de l'offre a changé")
+parser.add_argument("--ttl", type=float, default=7, help="Durée (en jours) au-delà de laquelle une page de détail est relue")
+parser.add_argument("--cache-http", metavar="DOSSIER", help="Garder les pages dans ce dossier et les revalider par requête conditionnelle (304)")
+parser.add_argument("--parquet", metavar="DOSSIER", help="Écrire les offres en Parquet partitionné dans ce dossier")
+parser.add_argument("--sqlite", metavar="FICHIER", help="Écrire les offres dans cette base SQLite (sans doublons)")
+args = parser.parse_args()
 
 url = "https://cameroun.minajobs.net/offres-emplois-stages"
+if args.resume:
+    reprise = activer_reprise()
+if args.cache_http:
+    activer_cache_http(args.cache_http)
+if args.empreintes:
+    empreintes = activer_empreintes(ttl_jours=args.ttl)
+if args.parquet:
+    configurer_ecrivain(StockageParquet(args.parquet))
+elif args.sqlite:
+    configurer_ecrivain(StockageSQLite(args.sqlite))
+# L'index des offres connues est construit à partir du stockage choisi
+if args.incremental:
+    activer_mode_incremental(seuil=args.seuil)
+
 print("Contact au driver...")
 driver = start_browser()
+pool = PoolNavigateurs()
 print("driver contacté !")
 
-scrape_all_pages_minajobs(url , driver, first=300)
+scrape_all_pages_minajobs(url , driver, first=args.first, pool=pool)
 
-driver.close()
\ No newline at end of file
+rapport_rendu()
+if args.empreintes:
+    empreintes.rapport()
+    empreintes.fermer()
+pool.fermer()
+driver.close()
+if args.resume:
+    reprise.fermer()
\ No newline at end of file
@@ -0,0 +1,82 @@
+import argparse
+import time
+
+from main import PoolNavigateurs, activer_cache_http, activer_empreintes, activer_moteur_async, \
+    activer_mode_incremental, activer_progression, activer_reprise, configurer_ecrivain, desactiver_moteur_async, \
+    rapport_rendu
+from sites import SITES, crawler_sites
+from stockage import StockageParquet, StockageSQLite
+
+
+# Fonction permettant de lire les options de la forme ORIGINE=VALEUR
+def origine_valeur(texte):
+    origine, separateur, valeur = texte.partition('=')
+    if not separateur or origine not in SITES:
+        raise argparse.ArgumentTypeError(f"attendu ORIGINE=VALEUR avec ORIGINE parmi : {', '.join(SITES)}")
+    return origine, valeur
+
+
+parser = argparse.ArgumentParser(description="Scraping des offres de tous les sites en parallèle")
+parser.add_argument("--sites", nargs="+", choices=list(SITES), help="Sites à parcourir (tous par défaut)")
+parser.add_argument("--url", type=origine_valeur, action="append", default=[], metavar="ORIGINE=URL",
+                    help="Url de la liste d'un site (obligatoire pour les sites sans url déclarée)")
+parser.add_argument("--concurrence", type=origine_valeur, action="append", default=[], metavar="ORIGINE=N",
+                    help="Nombre de pages de liste d'un site traitées en parallèle")
+parser.add_argument("--connexions", type=origine_valeur, action="append", default=[], metavar="ORIGINE=N",
+                    help="Nombre de requêtes simultanées vers un site (--max-par-hote par défaut)")
+parser.add_argument("--max-par-hote", type=int, default=4, help="Requêtes simultanées par site, par défaut")
+parser.add_argument("--max-connexions", type=int, default=20, help="Requêtes simultanées, tous sites confondus")
+parser.add_argument("--navigateur", action="store_true", help="Lancer un pool de navigateurs (sites rendus en JavaScript)")
+parser.add_argument("--intervalle", type=int, default=10, help="Délai (en secondes) entre deux affichages de la progression")
+parser.add_argument("--resume", action="store_true", help="Reprendre là où le dernier crawl s'est arrêté")
+parser.add_argument("--incremental", action="store_true", help="S'arrêter dès que les offres déjà enregistrées sont atteintes")
+parser.add_argument("--seuil", type=int, default=20, help="Nombre d'offres connues consécutives qui arrête la pagination")
+parser.add_argument("--empreintes", action="store_true", help="Ne relire une page de détail que si la carte de l'offre a changé")
+parser.add_argument("--ttl", type=float, default=7, help="Durée (en jours) au-delà de laquelle une page de détail est relue")
+parser.add_argument("--cache-http", metavar="DOSSIER", help="Garder les pages dans ce dossier et les revalider par requête conditionnelle (304)")
+parser.add_argument("--parquet", metavar="DOSSIER", help="Écrire les offres en Parquet partitionné dans ce dossier")
+parser.add_argument("--sqlite", metavar="FICHIER", help="Écrire les offres dans cette base SQLite (sans doublons)")
+args = parser.parse_args()
+
+urls = dict(args.url)
+concurrences = {origine: int(valeur) for origine, valeur in args.concurrence}
+
+# Budget de connexions d'un site appliqué à chacun de ses hôtes
+limites_hotes = {}
+for origine, valeur in args.connexions:
+    for hote in SITES[origine].hotes(urls.get(origine)):
+        limites_hotes[hote] = int(valeur)
+
+if args.resume:
+    reprise = activer_reprise()
+if args.cache_http:
+    activer_cache_http(args.cache_http)
+if args.empreintes:
+    empreintes = activer_empreintes(ttl_jours=args.ttl)
+if args.parquet:
+    configurer_ecrivain(StockageParquet(args.parquet))
+elif args.sqlite:
+    configurer_ecrivain(StockageSQLite(args.sqlite))
+# L'index des offres connues est construit à partir du stockage choisi
+if args.incremental:
+    activer_mode_incremental(seuil=args.seuil)
+
+activer_moteur_async(max_par_hote=args.max_par_hote, max_connexions=args.max_connexions, limites_hotes=limites_hotes)
+progression = activer_progression(args.intervalle)
+pool = PoolNavigateurs() if args.navigateur else None
+
+debut = time.monotonic()
+try:
+    crawler_sites(args.sites, urls=urls, pool=pool, concurrences=concurrences)
+finally:
+    progression.arreter()
+    print(f"Scraping de tous les sites terminé en {time.monotonic() - debut:.0f} s")
+    rapport_rendu()
+    if pool is not None:
+        pool.fermer()
+    desactiver_moteur_async()
+    if args.empreintes:
+        empreintes.rapport()
+        empreintes.fermer()
+    if args.resume:
+        reprise.fermer()
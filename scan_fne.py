@@ -0,0 +1,247 @@
+import json
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from main import EXTRACTEURS_FNE, ajouter_offres, compter_progression, obtenir_ecrivain, offre_a_ignorer, \
+    scrape_plusieurs, sonder_plusieurs
+
+#Frontières des séries de références apprises lors des parcours précédents
+FICHIER_FRONTIERES = 'fne_frontieres.json'
+
+#Journal des références non téléchargées parce que leur page avait la taille d'une page vide
+FICHIER_SAUTEES = 'fne_sautees.txt'
+
+#Gabarits des urls d'offres FNE ({annee} : une série de références par année, années ajoutées automatiquement)
+# - plancher : pas de fin de série admise avant cette référence (débuts de séries à trous)
+# - trous : nombre de références vides consécutives qui marque la fin d'une série
+GABARITS_FNE = [
+    {'type_lien': 1, 'chemin': 'jla_afficheoffre.php?reference={reference}', 'plancher': 33950, 'trous': 10},
+    {'type_lien': 2, 'chemin': 'c_afficheoffre.php?reference=C04-OE-{annee}-{reference}', 'plancher': 200, 'trous': 100},
+]
+
+
+#Parcours des références FNE par tranches parallèles
+class ScanFNE:
+    """
+    Chaque série de références (un gabarit, et une année pour les gabarits qui en ont une) est
+    découpée en tranches sondées en parallèle. Une requête HEAD donne la taille de chaque page :
+    celles qui ont la taille d'une page vide ne sont pas téléchargées. La dernière référence trouvée
+    de chaque série est enregistrée : le parcours suivant ne reprend qu'à partir de cette frontière.
+
+    La taille d'une page vide n'est retenue qu'après plusieurs pages vides de même taille, et un
+    échantillon des pages sautées est tout de même téléchargé : si l'une d'elles contient une offre,
+    la taille est oubliée (et n'est plus apprise). Les références sautées sont notées dans un journal.
+
+    :param url: Adresse du site FNE
+    :param fichier: Fichier JSON des frontières apprises
+    :param fichier_sautees: Journal des références sautées (url et taille annoncée)
+    :param nb_tranches: Nombre de tranches traitées en parallèle
+    :param taille_tranche: Nombre de références par tranche
+    :param marge: Nombre de références rescannées avant la frontière (offres publiées en retard)
+    :param complet: Rescanner aussi les références avant la frontière (en tranches parallèles)
+    :param tolerance: Écart de taille (en octets) toléré avec la page vide
+    :param confirmations: Nombre de pages vides de même taille avant de retenir cette taille
+    :param controles: Nombre de pages sautées téléchargées malgré tout, par tranche
+    :param echecs_head: Nombre de tranches consécutives sans aucune taille avant d'arrêter les requêtes HEAD
+    :param relance_head: Nombre de tranches après lequel les requêtes HEAD arrêtées sont réessayées
+    :param gabarits: Gabarits des urls (GABARITS_FNE par défaut)
+    """
+    def __init__(self, url, fichier=FICHIER_FRONTIERES, nb_tranches=8, taille_tranche=25, marge=50,
+                 complet=False, tolerance=256, confirmations=3, controles=1, echecs_head=3, relance_head=20,
+                 gabarits=None, fichier_sautees=FICHIER_SAUTEES):
+        self.url = url.rstrip('/')
+        self.fichier = fichier
+        self.fichier_sautees = fichier_sautees
+        self.nb_tranches = nb_tranches
+        self.taille_tranche = taille_tranche
+        self.marge = marge
+        self.complet = complet
+        self.tolerance = tolerance
+        self.confirmations = confirmations
+        self.controles = controles
+        self.echecs_head = echecs_head
+        self.relance_head = relance_head
+        self.gabarits = gabarits or GABARITS_FNE
+        self.offres = []
+        self._verrou = threading.Lock()
+        self._tranches_sans_taille = 0
+        self._tranches_sans_head = 0
+
+        try:
+            with open(fichier, encoding='utf-8') as f:
+                self.etat = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.etat = {}
+
+    def _sauvegarder(self):
+        with open(self.fichier + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.etat, f, indent=2)
+        os.replace(self.fichier + '.tmp', self.fichier)
+
+    def series(self):
+        """
+        :return: liste (gabarit, préfixe des urls de la série, année ou None)
+        """
+        annee_courante = datetime.now().year
+        series = []
+        for gabarit in self.gabarits:
+            if '{annee}' not in gabarit['chemin']:
+                series.append((gabarit, gabarit['chemin'].format(reference=''), None))
+                continue
+            # Années déjà rencontrées, plus l'année précédente et l'année en cours
+            annees = {serie['annee'] for serie in self.etat.values()
+                      if serie.get('type_lien') == gabarit['type_lien'] and serie.get('annee') is not None}
+            for annee in sorted(annees | {annee_courante - 1, annee_courante}):
+                series.append((gabarit, gabarit['chemin'].format(annee=annee, reference=''), annee))
+        return series
+
+    def _utiliser_head(self):
+        with self._verrou:
+            if self._tranches_sans_taille < self.echecs_head:
+                return True
+            # Requêtes HEAD arrêtées : nouvel essai de temps en temps (la panne était peut-être passagère)
+            self._tranches_sans_head += 1
+            if self._tranches_sans_head >= self.relance_head:
+                self._tranches_sans_head = 0
+                return True
+            return False
+
+    def _signaler_head(self, sans_taille):
+        with self._verrou:
+            if not sans_taille:
+                self._tranches_sans_taille = 0
+                return
+            self._tranches_sans_taille += 1
+            if self._tranches_sans_taille == self.echecs_head:
+                # Le serveur n'annonce pas la taille des pages : les requêtes HEAD ne servent à rien
+                print(f"FNE : aucune taille sur {self.echecs_head} tranches, requêtes HEAD arrêtées")
+
+    def _apprendre_taille_vide(self, serie, taille):
+        with self._verrou:
+            # Une taille déjà démentie par une offre ne peut plus être celle d'une page vide
+            if any(abs(taille - refutee) <= self.tolerance for refutee in serie.get('tailles_refutees', [])):
+                return
+            tailles_vides = serie.setdefault('tailles_vides', {})
+            tailles_vides[str(taille)] = tailles_vides.get(str(taille), 0) + 1
+            if serie.get('taille_vide') is None and tailles_vides[str(taille)] >= self.confirmations:
+                serie['taille_vide'] = taille
+                print(f"FNE : taille d'une page vide retenue : {taille} octets")
+
+    def _oublier_taille_vide(self, serie, url):
+        with self._verrou:
+            if serie.get('taille_vide') is not None:
+                print(f"FNE : offre trouvée à la taille d'une page vide ({url}), taille oubliée")
+                serie.setdefault('tailles_refutees', []).append(serie['taille_vide'])
+            serie['taille_vide'] = None
+            serie['tailles_vides'] = {}
+
+    def _journaliser_sautees(self, serie, urls, tailles, sautees):
+        with self._verrou:
+            serie['sautees'] = serie.get('sautees', 0) + len(sautees)
+            with open(self.fichier_sautees, 'a', encoding='utf-8') as f:
+                f.writelines(f"{urls[reference]}\t{tailles[reference]}\n" for reference in sautees)
+
+    def _telecharger(self, gabarit, serie, urls, references, tailles):
+        """
+        :return: références où une offre existe
+        """
+        pages = scrape_plusieurs([urls[reference] for reference in references])
+        compter_progression('FNE', pages=len(references))
+        trouvees = []
+        for reference, soup in zip(references, pages):
+            champs = EXTRACTEURS_FNE[gabarit['type_lien']].extraire_premiere(soup)
+            if champs is None:
+                if soup is not None and tailles.get(reference) is not None:
+                    self._apprendre_taille_vide(serie, tailles[reference])
+                continue
+            trouvees.append(reference)
+            ajouter_offres(self.offres, urls[reference], compagnie='', date_publication='', origine='FNE', **champs)
+        return trouvees
+
+    def sonder(self, gabarit, prefixe, references):
+        """
+        Récupère les offres d'une tranche de références.
+
+        :return: références où une offre existe
+        """
+        serie = self.etat[prefixe]
+        urls = {reference: f"{self.url}/{prefixe}{reference:06d}" for reference in references}
+
+        # Une offre déjà enregistrée prouve que la référence existe, sans la télécharger
+        trouvees = [reference for reference, url in urls.items() if offre_a_ignorer('FNE', url)]
+        candidates = [reference for reference in references if reference not in trouvees]
+
+        tailles = {}
+        sautees = []
+        controles = []
+        if candidates and self._utiliser_head():
+            tailles = dict(zip(candidates, sonder_plusieurs([urls[reference] for reference in candidates])))
+            compter_progression('FNE', pages=len(candidates))
+            self._signaler_head(all(taille is None for taille in tailles.values()))
+            taille_vide = serie.get('taille_vide')
+            if taille_vide is not None:
+                sautees = [reference for reference in candidates
+                           if tailles[reference] is not None and abs(tailles[reference] - taille_vide) <= self.tolerance]
+                # Un échantillon des pages à sauter est tout de même téléchargé pour contrôler la taille retenue
+                controles = random.sample(sautees, min(self.controles, len(sautees)))
+                sautees = [reference for reference in sautees if reference not in controles]
+                candidates = [reference for reference in candidates if reference not in sautees]
+
+        trouvees_tranche = self._telecharger(gabarit, serie, urls, candidates, tailles)
+        controles_pleins = [reference for reference in controles if reference in trouvees_tranche]
+        if controles_pleins:
+            # La taille retenue n'est pas celle d'une page vide : les pages sautées sont téléchargées
+            self._oublier_taille_vide(serie, urls[controles_pleins[0]])
+            trouvees_tranche += self._telecharger(gabarit, serie, urls, sautees, {})
+            sautees = []
+        if sautees:
+            self._journaliser_sautees(serie, urls, tailles, sautees)
+        return trouvees + trouvees_tranche
+
+    def _en_parallele(self, executeur, gabarit, prefixe, references):
+        tranches = [references[i:i + self.taille_tranche] for i in range(0, len(references), self.taille_tranche)]
+        trouvees = []
+        for resultat in executeur.map(lambda tranche: self.sonder(gabarit, prefixe, tranche), tranches):
+            trouvees.extend(resultat)
+        return trouvees
+
+    def parcourir_serie(self, executeur, gabarit, prefixe, annee):
+        serie = self.etat.setdefault(prefixe, {'type_lien': gabarit['type_lien'], 'annee': annee, 'derniere': 0})
+        frontiere = serie['derniere']
+        if self.complet:
+            debut = 1
+        else:
+            debut = max(1, frontiere - self.marge + 1)
+        print(f"FNE : série {prefixe}, frontière {frontiere}, reprise à la référence {debut}")
+
+        derniere = frontiere
+        taille_lot = self.nb_tranches * self.taille_tranche
+        while True:
+            trouvees = self._en_parallele(executeur, gabarit, prefixe, list(range(debut, debut + taille_lot)))
+            derniere = max([derniere] + trouvees)
+            fin_lot = debut + taille_lot - 1
+            debut += taille_lot
+
+            # Les offres doivent être sur disque avant d'avancer la frontière
+            obtenir_ecrivain().vider()
+            serie['derniere'] = derniere
+            self._sauvegarder()
+            if fin_lot > max(frontiere, gabarit['plancher']) and fin_lot - derniere >= gabarit['trous']:
+                break
+        print(f"FNE : série {prefixe} terminée, dernière référence {derniere} "
+              f"({serie.get('sautees', 0)} références sautées au total, voir {self.fichier_sautees})")
+
+    def parcourir(self):
+        with ThreadPoolExecutor(max_workers=self.nb_tranches) as executeur:
+            for gabarit, prefixe, annee in self.series():
+                self.parcourir_serie(executeur, gabarit, prefixe, annee)
+        print(f"FNE : {len(self.offres)} nouvelles offres")
+        return self.offres
+
+
+# Fonction permettant de parcourir les offres FNE (voir ScanFNE)
+def scanner_fne(url, **options):
+    return ScanFNE(url, **options).parcourir()
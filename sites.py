@@ -0,0 +1,215 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from urllib.parse import urlparse
+
+import main
+from extraction import Champ, Extracteur
+from main import (EXTRACTEUR_CAMEROONDESK, EXTRACTEUR_DETAILS_LOUMAJOBS, EXTRACTEUR_DETAILS_MINAJOBS,
+                  EXTRACTEUR_DETAILS_OPTIONCARRIERE, EXTRACTEUR_EMPLOICM, EXTRACTEUR_MINAJOBS,
+                  EXTRACTEUR_OPTIONCARRIERE, activer_moteur_async, ajouter_offres, details_memorises,
+                  memoriser_details, obtenir_ecrivain, obtenir_pages, offre_a_ignorer, scrape_all_pages,
+                  terminer_reprise_origine)
+from scan_fne import scanner_fne
+
+
+#Description d'un site à parcourir
+class Site:
+    """
+    Un site est déclaré une fois : pagination, sélecteurs de la liste et de la page de détail,
+    mode de rendu. Le même moteur (crawler_site) parcourt tous les sites déclarés.
+
+    :param origine: Nom de la source (colonne origine des offres)
+    :param urls: Url(s) de la liste des offres (None : à fournir au lancement)
+    :param pagination: 'path' (/page/N), 'query' (?parametre_page=N) ou 'aucune' (une seule page)
+    :param parametre_page: Nom du paramètre de page (pagination 'query')
+    :param premiere_page: Numéro de la première page
+    :param liste: Extracteur des cartes de la liste (le champ lien mène à la page de détail)
+    :param details: Extracteur de la page de détail, optionnel
+    :param rendu: Mode de rendu de la liste ('http', 'navigateur' ou 'auto'), sinon celui de modes_rendu,
+                  sinon 'http' : un pool de navigateurs n'est utilisé que par les sites qui le demandent
+    :param rendu_details: Mode de rendu des pages de détail (même règle)
+    :param requis_liste: Sélecteurs qui doivent être présents dans une liste bien rendue
+    :param requis_details: Sélecteurs qui doivent être présents dans une page de détail bien rendue
+    :param garder: Fonction offre -> bool qui écarte des offres (ex: les stages)
+    :param concurrence: Nombre de pages de liste traitées en parallèle
+    :param parcours: Fonction parcours(url) remplaçant la pagination (ex: références FNE)
+    """
+    def __init__(self, origine, urls=None, pagination='query', parametre_page='page', premiere_page=0,
+                 liste=None, details=None, rendu=None, rendu_details=None, requis_liste=(),
+                 requis_details=(), garder=None, concurrence=1, parcours=None):
+        self.origine = origine
+        self.urls = [urls] if isinstance(urls, str) else list(urls or [])
+        self.pagination = pagination
+        self.parametre_page = parametre_page
+        self.premiere_page = premiere_page
+        self.liste = liste
+        self.details = details
+        self.rendu = rendu
+        self.rendu_details = rendu_details
+        self.requis_liste = requis_liste
+        self.requis_details = requis_details
+        self.garder = garder
+        self.concurrence = concurrence
+        self.parcours = parcours
+
+    def hotes(self, urls=None):
+        return {urlparse(url).netloc for url in (urls or self.urls)}
+
+    def mode(self, rendu):
+        return rendu or main.modes_rendu.get(self.origine, 'http')
+
+    def utilise_navigateur(self):
+        return 'navigateur' in (self.mode(self.rendu), self.mode(self.rendu_details))
+
+
+#Sites déclarés (clé : origine)
+SITES = {}
+
+def enregistrer_site(site):
+    SITES[site.origine] = site
+    return site
+
+
+#Champs d'une ligne du tableau JobInfoCamer (la compagnie est le premier lien du paragraphe, le lieu le texte qui le suit)
+EXTRACTEUR_JOBINFOCAMER = Extracteur(carte='table tr', champs={
+    'date_publication': Champ('td:nth-child(1) a'),
+    'titre': Champ('td:nth-child(2) strong'),
+    'compagnie': Champ('td:nth-child(2) p a'),
+    'lieu': Champ('td:nth-child(2) p a', texte_suivant=True),
+    'type_contrat': Champ('td:nth-child(3) span'),
+    'lien': Champ('td:nth-child(2) a', attribut='href'),
+})
+
+#Champs d'une carte de la liste Louma Jobs (page rendue par le navigateur)
+EXTRACTEUR_LOUMAJOBS = Extracteur(carte='.emploi', champs={
+    'lien': Champ("h3.card_default__title a", attribut='href'),
+    'lieu': Champ("div.card_default__tags span"),
+    'titre': Champ("h3.card_default__title a"),
+    'type_contrat': Champ(".card_default__content p:nth-of-type(2)"),
+    'date_expiration': Champ(".card_default__datepublication p",
+                             nettoyer=lambda valeur: valeur.lower().replace("date cloture : ", "")),
+})
+
+enregistrer_site(Site('emploicm', pagination='query', parametre_page='page', premiere_page=0,
+                      liste=EXTRACTEUR_EMPLOICM, requis_liste=('.card-job',), concurrence=4))
+enregistrer_site(Site('Cameroon Desk', pagination='aucune', liste=EXTRACTEUR_CAMEROONDESK))
+enregistrer_site(Site('jobinfocamer', pagination='aucune', liste=EXTRACTEUR_JOBINFOCAMER,
+                      garder=lambda offre: bool(offre['lien'])))
+enregistrer_site(Site('FNE', parcours=scanner_fne))
+enregistrer_site(Site('Louma Jobs', pagination='path', premiere_page=0, liste=EXTRACTEUR_LOUMAJOBS,
+                      details=EXTRACTEUR_DETAILS_LOUMAJOBS, rendu='navigateur', rendu_details='http',
+                      requis_details=('article',)))
+enregistrer_site(Site('minajobs', urls='https://cameroun.minajobs.net/offres-emplois-stages',
+                      pagination='query', parametre_page='p', premiere_page=1,
+                      liste=EXTRACTEUR_MINAJOBS, details=EXTRACTEUR_DETAILS_MINAJOBS,
+                      requis_liste=('.desktop-listing-content',), requis_details=('div.detail-font',)))
+enregistrer_site(Site('optioncarriere', urls=[
+    'https://www.optioncarriere.cm/emploi/R%C3%A9gion-du-Littoral',
+    'https://www.optioncarriere.cm/emploi/R%C3%A9gion-de-l%E2%80%99Ouest',
+    'https://www.optioncarriere.cm/emploi/R%C3%A9gion-du-Nord-Ouest',
+    'https://www.optioncarriere.cm/emploi/R%C3%A9gion-du-Sud-Ouest',
+    'https://www.optioncarriere.cm/emploi/R%C3%A9gion-du-Nord',
+    'https://www.optioncarriere.cm/emploi/R%C3%A9gion-de-l%E2%80%99Adamaoua',
+    'https://www.optioncarriere.cm/emploi/R%C3%A9gion-de-l%E2%80%99Est',
+    'https://www.optioncarriere.cm/emploi/R%C3%A9gion-du-Centre',
+    'https://www.optioncarriere.cm/emploi/R%C3%A9gion-du-Sud',
+], pagination='query', parametre_page='p', premiere_page=1, liste=EXTRACTEUR_OPTIONCARRIERE,
+    details=EXTRACTEUR_DETAILS_OPTIONCARRIERE, garder=lambda offre: offre['type_contrat'].lower() != 'stage',
+    concurrence=2))
+
+
+# Fonction permettant de traiter une page de liste d'un site déclaré
+def scraper_page(site, url, driver=None, pool=None):
+    """
+    Extrait les cartes de la page, récupère en parallèle les pages de détail des offres
+    nouvelles (sauf celles dont la carte n'a pas changé, voir EmpreintesCartes) puis ajoute
+    les offres retenues.
+
+    :return: liste des offres ajoutées (vide en fin de pagination)
+    """
+    page = obtenir_pages([url], site.origine, site.requis_liste, driver=driver, pool=pool,
+                         mode=site.mode(site.rendu))[0]
+    cartes = [carte for carte in site.liste.extraire_tout(page)
+              if not offre_a_ignorer(site.origine, carte.get('lien', ''))]
+
+    if site.details is not None and cartes:
+        details_cartes = [details_memorises(site.origine, carte) for carte in cartes]
+        a_telecharger = [i for i, details in enumerate(details_cartes) if details is None]
+        print(f"{site.origine} : {len(a_telecharger)} pages de détail ({len(cartes) - len(a_telecharger)} déjà lues)...")
+        pages = obtenir_pages([cartes[i]['lien'] for i in a_telecharger], site.origine, site.requis_details,
+                              driver=driver, pool=pool, mode=site.mode(site.rendu_details))
+        for i, page_detail in zip(a_telecharger, pages):
+            details_cartes[i] = site.details.extraire_premiere(page_detail)
+            if details_cartes[i] is not None:
+                memoriser_details(site.origine, cartes[i], details_cartes[i])
+        cartes = [{**carte, **details} for carte, details in zip(cartes, details_cartes) if details is not None]
+
+    offres = []
+    for champs in cartes:
+        if site.garder is None or site.garder(champs):
+            ajouter_offres(offres, origine=site.origine, **champs)
+    return offres
+
+
+# Fonction permettant de parcourir un site déclaré
+def crawler_site(site, urls=None, driver=None, pool=None, concurrence=None, premiere_page=None):
+    """
+    :param urls: Url(s) de la liste, à la place de celles déclarées
+    :param driver: Navigateur (une page à la fois)
+    :param pool: PoolNavigateurs pour les sites qui demandent un navigateur
+    :param concurrence: Nombre de pages de liste en parallèle (celui du site par défaut)
+    :param premiere_page: Première page, à la place de celle déclarée
+    """
+    urls = [urls] if isinstance(urls, str) else list(urls or site.urls)
+    if not urls:
+        print(f"{site.origine} : aucune url de liste renseignée, site ignoré")
+        return
+    if site.utilise_navigateur() and driver is None and pool is None:
+        print(f"{site.origine} : ce site demande un navigateur (driver ou pool), site ignoré")
+        return
+
+    fonction_scraping = partial(scraper_page, site, pool=pool)
+    for url in urls:
+        print(f"{site.origine} : parcours de {url}")
+        if site.parcours is not None:
+            site.parcours(url)
+        elif site.pagination == 'aucune':
+            fonction_scraping(url, driver)
+        else:
+            scrape_all_pages(url, fonction_scraping, site.pagination, driver=driver,
+                             first=site.premiere_page if premiere_page is None else premiere_page,
+                             type_format=site.parametre_page, concurrence=concurrence or site.concurrence,
+                             origine=site.origine)
+    # Les offres traitées ne sont oubliées qu'une fois toutes les urls du site parcourues :
+    # un arrêt en cours de route laisse --resume sauter celles des urls déjà terminées
+    terminer_reprise_origine(site.origine)
+
+
+# Fonction permettant de parcourir plusieurs sites en même temps
+def crawler_sites(origines=None, urls=None, pool=None, concurrences=None):
+    """
+    Chaque site est parcouru dans son propre thread : la durée totale est celle du site le plus
+    long. Les requêtes passent toutes par le même moteur asynchrone (pool de connexions, limite
+    par hôte), le même planificateur de politesse et le même écrivain d'offres.
+
+    :param origines: Sites à parcourir (tous les sites déclarés par défaut)
+    :param urls: Urls par origine, pour les sites sans url déclarée (ex: {'emploicm': '...'})
+    :param pool: PoolNavigateurs partagé par les sites qui demandent un navigateur
+    :param concurrences: Nombre de pages de liste en parallèle par origine (celui du site par défaut)
+    """
+    sites = [SITES[origine] for origine in (origines or SITES)]
+    urls = urls or {}
+    concurrences = concurrences or {}
+    if main.moteur is None:
+        activer_moteur_async()
+
+    with ThreadPoolExecutor(max_workers=max(1, len(sites))) as executeur:
+        futurs = {executeur.submit(crawler_site, site, urls.get(site.origine), pool=pool,
+                                   concurrence=concurrences.get(site.origine)): site for site in sites}
+        for futur in as_completed(futurs):
+            try:
+                futur.result()
+                print(f"{futurs[futur].origine} : parcours terminé")
+            except Exception as e:
+                print(f"{futurs[futur].origine} : parcours interrompu ({e})")
+    obtenir_ecrivain().vider()
@@ -0,0 +1,363 @@
+import csv
+import io
+import os
+import sqlite3
+import uuid
+from contextlib import closing
+from datetime import datetime
+from urllib.parse import unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from normalisation_dates import normaliser_serie_dates
+
+#Colonnes du fichier des offres
+CHAMPS_OFFRE = ['lien', 'titre', 'compagnie', 'description', 'niveau_etude', 'experience', 'type_contrat',
+                'lieu', 'date_publication', 'date_expiration', 'origine']
+COLONNES_DATES = ['date_publication', 'date_expiration']
+
+#Taille (octets) à partir de laquelle un fichier Parquet n'est plus fusionné avec les nouveaux lots
+TAILLE_FICHIER_PARQUET = 32 * 1024 * 1024
+
+#Taille des blocs lus à la fois dans un export CSV (octets)
+TAILLE_BLOC_CSV = 16 * 1024 * 1024
+
+#Schéma typé des offres en Parquet (origine et mois deviennent les dossiers de partition)
+SCHEMA_PARQUET = pa.schema(
+    [(champ, pa.timestamp('us') if champ in COLONNES_DATES else pa.string())
+     for champ in CHAMPS_OFFRE] + [('mois', pa.string())]
+)
+
+
+# Fonction permettant de convertir une colonne de dates hétérogènes (date, texte jj/mm/aaaa, ISO...)
+def vers_dates(serie):
+    return normaliser_serie_dates(serie).astype('datetime64[ns]')
+
+
+#Stockage des offres dans un fichier CSV
+class StockageCSV:
+    """
+    Garde le fichier CSV ouvert et y ajoute chaque lot d'offres en un seul appel,
+    synchronisé sur disque.
+
+    :param fichier: Fichier CSV des offres
+    """
+    def __init__(self, fichier='offres_emploi.csv'):
+        self.fichier = fichier
+        ecrire_entete = not os.path.exists(fichier) or os.path.getsize(fichier) == 0
+        self._fichier = open(fichier, 'a', newline='', encoding='utf-8')
+        if ecrire_entete:
+            csv.DictWriter(self._fichier, fieldnames=CHAMPS_OFFRE).writeheader()
+            self._fichier.flush()
+
+    def ecrire_lot(self, offres):
+        texte = io.StringIO()
+        csv.DictWriter(texte, fieldnames=CHAMPS_OFFRE, extrasaction='ignore').writerows(offres)
+        self._fichier.write(texte.getvalue())
+        self._fichier.flush()
+        os.fsync(self._fichier.fileno())
+
+    def liens_connus(self):
+        """
+        :return: dictionnaire origine -> ensemble des liens déjà enregistrés
+        """
+        liens = {}
+        with open(self.fichier, newline='', encoding='utf-8') as f:
+            for ligne in csv.DictReader(f):
+                liens.setdefault(ligne.get('origine') or '', set()).add(ligne.get('lien') or '')
+        return liens
+
+    def fermer(self):
+        self._fichier.close()
+
+
+#Stockage des offres en Parquet partitionné
+class StockageParquet:
+    """
+    Écrit les offres en Parquet, partitionnées par origine et par mois de publication
+    (dossier/origine=.../mois=AAAA-MM/). Les colonnes de dates sont typées.
+    Chaque lot est écrit tout de suite dans ses propres fichiers (les offres sont sur disque dès
+    ecrire_lot) ; les petits fichiers d'une partition sont fusionnés dès qu'ils sont trop nombreux,
+    puis tous à la fermeture, pour que la lecture n'ouvre que quelques fichiers par partition.
+
+    :param dossier: Dossier racine du jeu de données
+    :param max_fichiers: Nombre de fichiers d'une partition au-delà duquel ils sont fusionnés
+    """
+    def __init__(self, dossier='offres_parquet', max_fichiers=16):
+        self.dossier = dossier
+        self.max_fichiers = max_fichiers
+        os.makedirs(dossier, exist_ok=True)
+
+    def ecrire_lot(self, offres):
+        df = pd.DataFrame(offres, columns=CHAMPS_OFFRE).fillna('')
+        for colonne in COLONNES_DATES:
+            df[colonne] = vers_dates(df[colonne])
+        df['origine'] = df['origine'].replace('', 'inconnue')
+        df['mois'] = df['date_publication'].dt.strftime('%Y-%m').fillna('inconnu')
+        for colonne in CHAMPS_OFFRE:
+            if colonne not in COLONNES_DATES:
+                df[colonne] = df[colonne].astype(str)
+
+        table = pa.Table.from_pandas(df, schema=SCHEMA_PARQUET, preserve_index=False)
+        pq.write_to_dataset(table, root_path=self.dossier, partition_cols=['origine', 'mois'],
+                            basename_template=f"lot-{uuid.uuid4().hex}-{{i}}.parquet")
+        compacter_parquet(self.dossier, min_fichiers=self.max_fichiers)
+
+    def liens_connus(self):
+        """
+        :return: dictionnaire origine -> ensemble des liens déjà enregistrés
+        """
+        if not any(fichier.endswith('.parquet') for _, _, fichiers in os.walk(self.dossier) for fichier in fichiers):
+            return {}
+        table = pq.read_table(self.dossier, columns=['origine', 'lien'])
+        liens = {}
+        for origine, lien in zip(table.column('origine').cast(pa.string()).to_pylist(), table.column('lien').to_pylist()):
+            liens.setdefault(origine, set()).add(lien)
+        return liens
+
+    def fermer(self):
+        compacter_parquet(self.dossier)
+
+
+# Fonction permettant de fusionner les petits fichiers de chaque partition Parquet
+def compacter_parquet(dossier='offres_parquet', min_fichiers=2, taille_cible=TAILLE_FICHIER_PARQUET):
+    """
+    Remplace les petits fichiers d'une partition par un seul fichier trié par date de publication.
+    Les fichiers qui ont déjà atteint la taille cible ne sont pas relus : une fusion ne coûte que
+    la taille des nouveaux lots. Le nouveau fichier est écrit sous un nom ignoré par les lecteurs
+    (préfixe _) puis renommé, les anciens fichiers sont supprimés ensuite.
+
+    :param min_fichiers: Nombre minimum de petits fichiers pour fusionner une partition
+    :param taille_cible: Taille (octets) à partir de laquelle un fichier n'est plus fusionné
+    :return: nombre de partitions fusionnées
+    """
+    partitions = 0
+    for dossier_partition, _, fichiers in os.walk(dossier):
+        chemins = sorted(os.path.join(dossier_partition, fichier) for fichier in fichiers if fichier.endswith('.parquet'))
+        chemins = [chemin for chemin in chemins if os.path.getsize(chemin) < taille_cible]
+        if len(chemins) < min_fichiers:
+            continue
+        table = pa.concat_tables([pq.read_table(chemin) for chemin in chemins]).sort_by('date_publication')
+        nom = f"partie-{uuid.uuid4().hex}.parquet"
+        temporaire = os.path.join(dossier_partition, f"_{nom}.tmp")
+        pq.write_table(table, temporaire)
+        os.replace(temporaire, os.path.join(dossier_partition, nom))
+        for chemin in chemins:
+            os.remove(chemin)
+        partitions += 1
+    return partitions
+
+
+#Schéma de la base SQLite : une ligne par lien
+SCHEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS offres (
+    lien TEXT PRIMARY KEY,
+    titre TEXT,
+    compagnie TEXT,
+    description TEXT,
+    niveau_etude TEXT,
+    experience TEXT,
+    type_contrat TEXT,
+    lieu TEXT,
+    date_publication TEXT,
+    date_expiration TEXT,
+    origine TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_offres_date_publication ON offres(date_publication);
+CREATE INDEX IF NOT EXISTS idx_offres_origine ON offres(origine);
+CREATE INDEX IF NOT EXISTS idx_offres_lieu ON offres(lieu);
+"""
+
+# Un nouveau passage met à jour l'offre sans effacer les champs déjà connus, et conserve first_seen
+UPSERT_SQLITE = f"""
+INSERT INTO offres ({', '.join(CHAMPS_OFFRE)}, first_seen, last_seen)
+VALUES ({', '.join('?' for _ in CHAMPS_OFFRE)}, ?, ?)
+ON CONFLICT(lien) DO UPDATE SET
+    {', '.join(f"{champ} = COALESCE(NULLIF(excluded.{champ}, ''), offres.{champ})" for champ in CHAMPS_OFFRE if champ != 'lien')},
+    last_seen = excluded.last_seen
+"""
+
+
+#Stockage des offres dans une base SQLite
+class StockageSQLite:
+    """
+    Base SQLite embarquée avec une ligne par lien. Une offre déjà présente est mise à jour
+    (upsert) au lieu d'être dupliquée ; first_seen et last_seen gardent la date du premier
+    et du dernier passage. Les dates sont stockées au format AAAA-MM-JJ pour être filtrées en SQL.
+
+    :param fichier: Fichier de la base
+    """
+    def __init__(self, fichier='offres.db'):
+        self.fichier = fichier
+        self._connexion = sqlite3.connect(fichier, check_same_thread=False)
+        self._connexion.execute('PRAGMA journal_mode=WAL')
+        self._connexion.executescript(SCHEMA_SQLITE)
+
+    def ecrire_lot(self, offres):
+        df = pd.DataFrame(offres, columns=CHAMPS_OFFRE).fillna('')
+        # Le lien est l'identifiant de l'offre : sans lien, l'offre ne peut pas être dédupliquée
+        df = df[df['lien'] != '']
+        for colonne in COLONNES_DATES:
+            df[colonne] = vers_dates(df[colonne]).dt.strftime('%Y-%m-%d')
+        df = df.astype(object).where(df.notna(), None)
+
+        maintenant = datetime.now().isoformat(timespec='seconds')
+        lignes = [tuple(ligne) + (maintenant, maintenant) for ligne in df.itertuples(index=False)]
+        with self._connexion:
+            self._connexion.executemany(UPSERT_SQLITE, lignes)
+
+    def liens_connus(self):
+        """
+        :return: dictionnaire origine -> ensemble des liens déjà enregistrés
+        """
+        liens = {}
+        for origine, lien in self._connexion.execute('SELECT origine, lien FROM offres'):
+            liens.setdefault(origine or '', set()).add(lien)
+        return liens
+
+    def fermer(self):
+        self._connexion.close()
+
+
+# Fonction permettant de lister les origines présentes dans un dossier Parquet
+def origines_parquet(dossier='offres_parquet'):
+    if not os.path.isdir(dossier):
+        return []
+    # Les valeurs de partition sont encodées dans les noms de dossier (ex: origine=Louma%20Jobs)
+    return sorted(unquote(nom.split('=', 1)[1]) for nom in os.listdir(dossier) if nom.startswith('origine='))
+
+
+# Fonction permettant de lire uniquement les partitions et colonnes utiles
+def lire_offres_parquet(dossier='offres_parquet', colonnes=None, origines=None, mois_debut=None, mois_fin=None):
+    """
+    Lit les offres Parquet en ne chargeant que les partitions et colonnes demandées.
+
+    :param colonnes: Colonnes à charger (toutes par défaut)
+    :param origines: Origines à charger (toutes par défaut)
+    :param mois_debut: Premier mois à charger (AAAA-MM)
+    :param mois_fin: Dernier mois à charger (AAAA-MM)
+    """
+    filtres = []
+    if origines:
+        filtres.append(('origine', 'in', list(origines)))
+    if mois_debut:
+        filtres.append(('mois', '>=', mois_debut))
+    if mois_fin:
+        filtres.append(('mois', '<=', mois_fin))
+
+    df = pd.read_parquet(dossier, engine='pyarrow', columns=colonnes, filters=filtres or None)
+    # Les colonnes de partition reviennent en catégories : on les remet en texte
+    for colonne in ('origine', 'mois'):
+        if colonne in df.columns:
+            df[colonne] = df[colonne].astype(str)
+    return df
+
+
+# Fonction permettant de lire un export CSV des offres par blocs
+def lire_offres_csv(source, colonnes=None, taille_bloc=TAILLE_BLOC_CSV):
+    """
+    Lit un export CSV des offres bloc par bloc avec le lecteur CSV de pyarrow. Seules les colonnes
+    demandées sont converties, toutes en texte (pas d'inférence de types) : les colonnes lourdes
+    non demandées comme la description ne sont jamais chargées en mémoire.
+
+    :param source: Chemin, fichier déposé ou flux binaire (réponse HTTP...)
+    :param colonnes: Colonnes à charger (toutes celles des offres par défaut) ; absentes du fichier, elles restent vides
+    :param taille_bloc: Taille en octets des blocs lus à la fois
+    """
+    colonnes = list(colonnes or CHAMPS_OFFRE)
+    # Un flux HTTP a une méthode seek mais ne peut pas revenir en arrière
+    if hasattr(source, 'seekable') and source.seekable():
+        source.seek(0)
+    lecteur = pacsv.open_csv(
+        source,
+        read_options=pacsv.ReadOptions(block_size=taille_bloc),
+        # Les descriptions peuvent contenir des retours à la ligne entre guillemets
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=colonnes,
+            include_missing_columns=True,
+            column_types={colonne: pa.string() for colonne in colonnes},
+            strings_can_be_null=True,
+        ),
+    )
+    table = pa.Table.from_batches(list(lecteur), schema=lecteur.schema)
+    # Conversion colonne par colonne, en libérant la table au fur et à mesure
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+# Fonction permettant d'ouvrir la base SQLite en lecture seule (sans jamais créer de fichier)
+def ouvrir_sqlite_lecture(fichier='offres.db'):
+    return closing(sqlite3.connect(f'file:{fichier}?mode=ro', uri=True))
+
+
+# Fonction permettant de vérifier que la base SQLite existe et contient la table des offres
+def base_sqlite_disponible(fichier='offres.db'):
+    if not os.path.isfile(fichier):
+        return False
+    try:
+        with ouvrir_sqlite_lecture(fichier) as connexion:
+            return connexion.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'offres'").fetchone() is not None
+    except sqlite3.DatabaseError:
+        return False
+
+
+# Fonction permettant de lister les origines présentes dans la base SQLite
+def origines_sqlite(fichier='offres.db'):
+    if not base_sqlite_disponible(fichier):
+        return []
+    with ouvrir_sqlite_lecture(fichier) as connexion:
+        return [ligne[0] for ligne in connexion.execute(
+            'SELECT DISTINCT origine FROM offres WHERE origine IS NOT NULL ORDER BY origine')]
+
+
+# Fonction permettant de lire les offres de la base en appliquant les filtres en SQL
+def lire_offres_sqlite(fichier='offres.db', colonnes=None, origines=None, date_debut=None, date_fin=None, lieux=None):
+    """
+    Lit les offres de la base SQLite. Les filtres sont traduits en clause WHERE,
+    seules les lignes et colonnes retenues sont chargées.
+
+    :param colonnes: Colonnes à charger (toutes par défaut)
+    :param origines: Origines à charger (toutes par défaut)
+    :param date_debut: Date de publication minimale (date ou AAAA-MM-JJ)
+    :param date_fin: Date de publication maximale (date ou AAAA-MM-JJ)
+    :param lieux: Lieux recherchés dans la colonne lieu (au moins un)
+    :return: DataFrame vide (avec les colonnes demandées) si la base ou la table offres n'existe pas
+    """
+    colonnes = [colonne for colonne in (colonnes or CHAMPS_OFFRE + ['first_seen', 'last_seen'])
+                if colonne in CHAMPS_OFFRE + ['first_seen', 'last_seen']]
+    if not base_sqlite_disponible(fichier):
+        df = pd.DataFrame(columns=colonnes)
+        for colonne in COLONNES_DATES:
+            if colonne in df.columns:
+                df[colonne] = pd.to_datetime(df[colonne])
+        return df
+    conditions = []
+    parametres = []
+    if origines:
+        conditions.append(f"origine IN ({', '.join('?' for _ in origines)})")
+        parametres.extend(origines)
+    if date_debut:
+        conditions.append('date_publication >= ?')
+        parametres.append(str(date_debut))
+    if date_fin:
+        conditions.append('date_publication <= ?')
+        parametres.append(str(date_fin))
+    if lieux:
+        conditions.append('(' + ' OR '.join('lieu LIKE ?' for _ in lieux) + ')')
+        parametres.extend(f'%{lieu}%' for lieu in lieux)
+
+    requete = f"SELECT {', '.join(colonnes)} FROM offres"
+    if conditions:
+        requete += ' WHERE ' + ' AND '.join(conditions)
+    with ouvrir_sqlite_lecture(fichier) as connexion:
+        df = pd.read_sql_query(requete, connexion, params=parametres)
+    for colonne in COLONNES_DATES:
+        if colonne in df.columns:
+            df[colonne] = pd.to_datetime(df[colonne], errors='coerce')
+    return df